@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 # Import modules for TUI and handlers
 import src.ui as ui
 import src.handlers as handlers
+import src.model_server as model_server
 
 # --- Path Configuration ---
 # Add the 'src' directory to sys.path to allow Python to find modules within it.
@@ -50,17 +51,21 @@ def main():
         console.print("[bold red]Failed to load configuration. Exiting.[/bold red]")
         sys.exit(1)
 
+    # `python main.py --serve` keeps the models loaded in a long-lived model server instead of running the TUI
+    if "--serve" in sys.argv[1:]:
+        model_server.serve(audio_processor, config_data)
+        return
+
     # Initialize stop event for background thread (not used in current handle_process_recordings)
     stop_event = threading.Event()
 
-    # Load models once at startup
-    # The stub load_models() in main.py returns True.
-    # If audio_processor.load_models() were to return actual models,
-    # they would need to be passed to processing functions.
-    loaded_models = audio_processor.load_models() # Modified to call audio_processor and store models
-    if not loaded_models: 
-        console.print("[bold red]Failed to load AI models. Exiting.[/bold red]")
-        sys.exit(1)
+    # Reuse the warm models of a running model server; otherwise they are loaded when recordings are first processed
+    processor = model_server.connect()
+    if processor:
+        console.print("[bold green]Connected to the running model server. Skipping model load.[/bold green]")
+    else:
+        processor = audio_processor
+    loaded_models = None # Held by the model server, or loaded on first use by audio_processor.process_audio_files
 
     # Ensure directories exist
     incoming_dir = config_data.get("app_settings", {}).get("incoming_audio_dir", "incoming/")
@@ -80,7 +85,7 @@ def main():
 
         if choice == '1':
             # Call the handler for processing recordings
-            handlers.handle_process_recordings(config_data, classes_data, loaded_models, audio_processor)
+            handlers.handle_process_recordings(config_data, classes_data, loaded_models, processor)
         elif choice == '2':
             # Call the handler for viewing recordings
             handlers.handle_view_recordings(classes_data, config_data)
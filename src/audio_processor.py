@@ -1,65 +1,140 @@
 import os
 import re # Import the 're' module
+import asyncio
+import atexit
+import contextlib
+import functools
+import hashlib
+from collections import deque
+from typing import TypedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime # Import datetime
 
-# ADD THIS LINE AT THE TOP OF THE FILE
-os.environ['HUGGING_FACE_HUB_CACHE'] = os.path.join(os.getcwd(), 'model_cache')
-
 import time
+import uuid
 import json
 import warnings
-import torch
+import numpy as np
 from dotenv import load_dotenv # Added this line
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.status import Status
 from rich.table import Table
 from rich.live import Live
-import yaml
+
+from src.common import SCHEDULE_MATCH_WINDOW_MINUTES, atomic_write
 import json
 import os
 
+# The AI model libraries (torch, faster-whisper, whisperx, pyannote, google-generativeai) take
+# seconds to import, so they are imported inside the functions that use them. Importing this
+# module stays cheap for TUI sessions that never process audio or that use the model server.
 
-# Imports for AI models
-from whisperx import load_model as load_whisper_model
-from pyannote.audio import Pipeline as load_pyannote_pipeline
-import google.generativeai as genai
-
-# Suppress specific warnings
-warnings.filterwarnings("ignore", category=UserWarning, module='torchaudio')
-warnings.filterwarnings("ignore", category=UserWarning, module='pyannote')
-warnings.filterwarnings("ignore", category=FutureWarning, module='pyannote')
+console = Console()
 
+SAMPLE_RATE = 16000 # WhisperX decodes every file to 16 kHz mono
+TRANSCRIBE_BATCH_SIZE = 24
+PIPELINE_QUEUE_SIZE = 2 # Files allowed to wait between two pipeline stages
+GEMINI_MAX_CONCURRENCY = 8 # Gemini requests in flight at once, per file
+CONTENT_FILES_IN_FLIGHT = 3 # Files whose Gemini content is generated at the same time
+GEMINI_MAX_ATTEMPTS = 3 # Tries per request when Gemini is rate limited or unavailable
+AI_CACHE_DIR = "ai_cache" # Gemini responses, keyed on model + prompt + transcript
+
+# SRT files are written off the critical path; pending writes are tracked by SRT path
+_IO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="srt-writer")
+_PENDING_SRT_WRITES = {}
+atexit.register(_IO_POOL.shutdown, wait=True)
+# Expected format: YYYY-MM-DD_HH-MM-SS_#.mp3 or YYYY-MM-DD_HH-MM-SS_#.wav
+_FILENAME_RE = re.compile(r"(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2}-\d{2})_.*\.(?:mp3|wav)$")
 
-load_dotenv() # Load environment variables from .env file
+# --- Functions for Audio Processing ---
 
-console = Console()
+def format_srt_timestamps(seconds) -> list:
+    """Converts a sequence of seconds to SRT time strings (HH:MM:SS,ms), all at once."""
+    milliseconds = np.round(np.asarray(seconds, dtype=float) * 1000.0).astype(np.int64)
+    assert (milliseconds >= 0).all(), "non-negative timestamps expected"
+    hours, milliseconds = np.divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = np.divmod(milliseconds, 60_000)
+    secs, milliseconds = np.divmod(milliseconds, 1_000)
+    return [
+        f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+        for h, m, s, ms in zip(hours.tolist(), minutes.tolist(), secs.tolist(), milliseconds.tolist())
+    ]
+
+@functools.cache
+def _configure_model_environment():
+    """
+    Prepares the environment for the model libraries. Runs once, before their first import,
+    since huggingface_hub reads these variables when it is imported.
+    """
+    os.environ['HUGGING_FACE_HUB_CACHE'] = os.path.join(os.getcwd(), 'model_cache')
+    # Use the Rust-based downloader for first-run model downloads when it is installed
+    try:
+        import hf_transfer # noqa: F401
+        os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+    except ImportError:
+        pass # Fall back to the standard huggingface_hub downloader
 
-# --- Functions for Audio Processing ---
+    # Suppress specific warnings
+    warnings.filterwarnings("ignore", category=UserWarning, module='torchaudio')
+    warnings.filterwarnings("ignore", category=UserWarning, module='pyannote')
+    warnings.filterwarnings("ignore", category=FutureWarning, module='pyannote')
 
-def format_srt_timestamp(seconds: float) -> str:
-    """Converts seconds to SRT time format HH:MM:SS,ms"""
-    assert seconds >= 0, "non-negative timestamp expected"
-    milliseconds = round(seconds * 1000.0)
-    hours = int(milliseconds / 3_600_000)
-    milliseconds -= hours * 3_600_000
-    minutes = int(milliseconds / 60_000)
-    milliseconds -= minutes * 60_000
-    seconds = int(milliseconds / 1_000)
-    milliseconds -= seconds * 1_000
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+    load_dotenv() # Load environment variables from .env file
 
-def write_srt_file(segments: list, filepath: str):
-    """Writes transcription segments to an SRT file."""
-    with open(filepath, "w", encoding="utf-8") as f:
-        for i, segment in enumerate(segments, start=1):
-            f.write(f"{i}\n")
-            f.write(f"{format_srt_timestamp(segment['start'])} --> {format_srt_timestamp(segment['end'])}\n")
-            f.write(f"{segment['text'].strip()}\n\n")
+@functools.cache
+def _cached_whisper(device, compute_type):
+    """Builds the batched faster-whisper pipeline once per (device, compute_type)."""
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+    model = WhisperModel(
+        "base", 
+        device=device, 
+        compute_type=compute_type, 
+        download_root="./model_cache"  # Point to the new directory
+    )
+    return BatchedInferencePipeline(model=model)
+
+@contextlib.contextmanager
+def _mmap_torch_load():
+    """
+    Makes torch.load memory-map checkpoint files while the block runs, so weights are
+    paged in from the model cache instead of being copied through a host-memory buffer.
+    """
+    import torch
+    original_load = torch.load
 
+    def mmap_load(f, *args, **kwargs):
+        # pyannote's loader passes an open file; mmap needs the path behind it
+        path = f if isinstance(f, (str, os.PathLike)) else getattr(f, "name", None)
+        if isinstance(path, (str, os.PathLike)) and os.path.isfile(path):
+            try:
+                return original_load(path, *args, **{**kwargs, "mmap": True})
+            except (TypeError, ValueError, RuntimeError):
+                pass # Legacy (non-zip) checkpoints or older torch: load normally
+        return original_load(f, *args, **kwargs)
 
+    torch.load = mmap_load
+    try:
+        yield
+    finally:
+        torch.load = original_load
+
+@functools.cache
+def _cached_diarization(hf_token, device):
+    """Builds the pyannote.audio pipeline once per (Hugging Face token, device)."""
+    import torch
+    from pyannote.audio import Pipeline as load_pyannote_pipeline
+    # Using a pre-trained diarization model. Requires HF token for access.
+    with _mmap_torch_load():
+        pipeline = load_pyannote_pipeline.from_pretrained(
+            "pyannote/speaker-diarization-3.1", 
+            use_auth_token=hf_token
+        )
+    # pyannote loads onto the CPU; move it so diarization actually runs on the GPU
+    pipeline.to(torch.device(device))
+    return pipeline
 
-def load_models():
+def load_models(config_data=None):
     """
     Loads AI models (WhisperX, pyannote.audio, Gemini) and returns them.
     Requires HF_TOKEN and GEMINI_API_KEY to be set in the .env file.
@@ -67,8 +142,15 @@ def load_models():
     console.print("[bold cyan]Loading AI models...[/bold cyan]")
     
     try:
+        _configure_model_environment()
+        import torch
+        import google.generativeai as genai
+
         # Check for CUDA
         device = "cuda" if torch.cuda.is_available() else "cpu"
+        # INT8 weights run natively on CPU and halve encoder bandwidth on GPU; fp16 can be set in config
+        app_settings = (config_data or {}).get("app_settings", {})
+        compute_type = app_settings.get("whisper_compute_type") or ("int8_float16" if device == "cuda" else "int8")
         
         # Load Hugging Face token
         hf_token = os.getenv("HF_TOKEN")
@@ -84,23 +166,12 @@ def load_models():
 
         # Initialize WhisperX model
         console.print("  - Initializing WhisperX model...")
-        whisper_model = load_whisper_model(
-            "base", 
-            device=device, 
-            compute_type="float16", 
-            download_root="./model_cache"  # Point to the new directory
-        )
+        whisper_model = _cached_whisper(device, compute_type)
         console.print("[green]  - WhisperX model initialized.[/green]")
 
         # Initialize pyannote.audio pipeline
         console.print("  - Initializing pyannote.audio pipeline...")
-        # Using a pre-trained diarization model. Requires HF token for access.
-        # Removed 'use_auth_token' argument as it caused an error.
-        # The token should be automatically picked up from the environment if set.
-        diarization_pipeline = load_pyannote_pipeline.from_pretrained(
-            "pyannote/speaker-diarization-3.1", 
-            use_auth_token=hf_token
-        )
+        diarization_pipeline = _cached_diarization(hf_token, device)
         console.print("[green]  - pyannote.audio pipeline initialized.[/green]")
 
         # Initialize Gemini model
@@ -119,123 +190,305 @@ def load_models():
         console.print(f"[red]Error loading AI models:[/red] {e}")
         return False
 
-def process_audio_file(filepath, config_data, classes_data, loaded_models):
+async def process_audio_files(filepaths, config_data, classes_data, loaded_models=None):
     """
-    Processes a single audio file using loaded AI models.
-    This involves transcription, diarization, segmentation, and AI content generation.
+    Processes several audio files as a three-stage pipeline:
+    transcription -> diarization/segmentation -> Gemini content generation.
+    While file N waits on Gemini, file N+1 is diarized and file N+2 transcribed.
+    Content for up to CONTENT_FILES_IN_FLIGHT files is generated at the same time.
+    Without `loaded_models` the models are loaded here; the heavy ones stay cached for later calls.
+    Async generator yielding (filepath, processed_data) in input order; processed_data is None on failure.
     """
-    console.print(f"\n[bold blue]Processing audio file:[/bold blue] {filepath}")
-    
-    # Use loaded models for transcription and diarization
-    transcription_result = transcribe_and_diarize(filepath, loaded_models["whisper"], loaded_models["diarization"])
-    if not transcription_result:
-        console.print("[red]Failed to transcribe and diarize audio.[/red]")
+    if loaded_models is None:
+        loaded_models = await asyncio.to_thread(load_models, config_data)
+        if not loaded_models:
+            console.print("[bold red]Failed to load AI models. No recordings were processed.[/bold red]")
+            return
+    batch_size = config_data.get("app_settings", {}).get("whisper_batch_size", TRANSCRIBE_BATCH_SIZE)
+    transcribed = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    segmented = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    async def transcription_stage():
+        for filepath in filepaths:
+            console.print(f"\n[bold blue]Processing audio file:[/bold blue] {filepath}")
+            transcription = await asyncio.to_thread(transcribe_file, filepath, loaded_models["whisper"], batch_size)
+            await transcribed.put((filepath, transcription))
+        await transcribed.put(None)
+
+    async def diarization_stage():
+        while (item := await transcribed.get()) is not None:
+            filepath, transcription = item
+            segmented_lectures = None
+            if transcription is not None:
+                try:
+                    segmented_lectures = await asyncio.to_thread(analyze_audio_file, filepath, classes_data, loaded_models, transcription)
+                except Exception as e:
+                    console.print(f"[red]Error analyzing {os.path.basename(filepath)}:[/red] {e}")
+            await segmented.put((filepath, segmented_lectures))
+        await segmented.put(None)
+
+    async def content_stage(filepath, segmented_lectures):
+        try:
+            processed_data = None
+            if segmented_lectures:
+                processed_data = await generate_lecture_content(segmented_lectures, config_data, loaded_models["gemini"])
+                console.print(f"[green]Audio file processed successfully:[/green] {os.path.basename(filepath)}")
+            # The caller archives the SRT file, so it has to be on disk first
+            await asyncio.to_thread(wait_for_srt, filepath)
+            return filepath, processed_data
+        except Exception as e:
+            # Awaited outside the caller's per-file handling, so a failure here must not end the run
+            console.print(f"[red]Error generating content for {os.path.basename(filepath)}:[/red] {e}")
+            return filepath, None
+
+    stages = [asyncio.create_task(transcription_stage()), asyncio.create_task(diarization_stage())]
+    in_flight = deque() # Content tasks, in input order
+    try:
+        while (item := await segmented.get()) is not None:
+            in_flight.append(asyncio.create_task(content_stage(*item)))
+            if len(in_flight) >= CONTENT_FILES_IN_FLIGHT:
+                yield await in_flight.popleft()
+        while in_flight:
+            yield await in_flight.popleft()
+    finally:
+        for task in [*stages, *in_flight]:
+            task.cancel()
+
+def analyze_audio_file(filepath, classes_data, loaded_models, transcription):
+    """
+    Runs diarization and segmentation for one file, given its transcription from transcribe_file.
+    Returns the segmented lectures, or None on failure.
+    """
+    transcription_result = diarize_transcription(filepath, transcription, loaded_models["diarization"])
+    if transcription_result is None or not transcription_result[0]:
+        console.print("[red]Failed to diarize audio.[/red]")
         return None
+    segments, full_transcript, speakers = transcription_result
     
     # Segment the transcription
-    segmented_lectures = segment_audio_by_class(transcription_result, classes_data, filepath, loaded_models) # Modified to pass filepath and loaded_models
+    segmented_lectures = segment_audio_by_class(segments, classes_data, filepath, loaded_models, full_transcript) # Modified to pass filepath and loaded_models
     if not segmented_lectures:
         console.print("[red]Failed to segment audio into classes.[/red]")
         return None
+    # Every lecture covers the whole recording, so they share its speaker list
+    for lectures in segmented_lectures.values():
+        for lecture in lectures:
+            lecture["speakers"] = speakers
+    return segmented_lectures
+
+async def generate_lecture_content(segmented_lectures, config_data, gemini_model):
+    """
+    Generates AI content (summary and highlights) for each segmented lecture.
+    Requests for different lectures run concurrently, up to GEMINI_MAX_CONCURRENCY at a time.
+    Returns the processed data keyed by class name, in the original lecture order.
+    """
+    llm_prompts = config_data.get("llm_prompts", {})
+    semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+    async def build_lecture_data(lecture):
+        async with semaphore:
+            summary, highlights = await generate_summary_and_highlights(lecture["transcript"], llm_prompts, gemini_model)
+        return {
+            "id": uuid.uuid4().hex, # Stable handle for later edits, e.g. speaker labeling
+            "metadata": lecture.get("metadata", {}),
+            "summary": summary,
+            "highlights": highlights,
+            "speakers": lecture.get("speakers") or list(dict.fromkeys(seg['speaker'] for seg in lecture['segments'])), # First-appearance order
+            "transcript_segments": lecture['segments']
+        }
 
-    # Generate AI content (summary and highlights) for each lecture
     processed_data = {}
+    pending = [] # (class_name, coroutine) in lecture order
     for class_name, lectures in segmented_lectures.items():
         processed_data[class_name] = []
         for lecture in lectures:
-            transcript_text = lecture.get("transcript", "")
-            
-            if transcript_text:
-                summary = generate_ai_content(transcript_text, config_data.get("llm_prompts", {}).get("summary_prompt", "Summarize this:"), loaded_models["gemini"])
-                highlights = generate_ai_content(transcript_text, config_data.get("llm_prompts", {}).get("highlights_prompt", "Extract highlights from this:"), loaded_models["gemini"])
-                
-                lecture_data = {
-                    "metadata": lecture.get("metadata", {}),
-                    "summary": summary,
-                    "highlights": highlights,
-                    "speakers": list(set(seg['speaker'] for seg in lecture['segments'])),
-                    "transcript_segments": lecture['segments']
-                }
-                processed_data[class_name].append(lecture_data)
+            if lecture.get("transcript", ""):
+                pending.append((class_name, build_lecture_data(lecture)))
             else:
                 console.print(f"[yellow]Skipping AI content generation for empty segment.[/yellow]")
 
-    console.print(f"[green]Audio file processed successfully.[/green]")
+    results = await asyncio.gather(*(coroutine for _, coroutine in pending))
+    for (class_name, _), lecture_data in zip(pending, results):
+        processed_data[class_name].append(lecture_data)
     return processed_data
 
-def transcribe_and_diarize(filepath, whisper_model, diarization_pipeline):
+def transcribe_file(filepath, whisper_model, batch_size=TRANSCRIBE_BATCH_SIZE):
+    """
+    Transcribes one audio file with the batched Whisper pipeline, decoding `batch_size` speech chunks at a time.
+    The file is decoded once and the waveform kept so diarization can reuse it.
+    Returns {"waveform": tensor, "segments": list}, or None on failure.
+    """
+    console.print(f"  - Transcribing {os.path.basename(filepath)}...")
+    try:
+        waveform = _load_waveform(filepath)
+        transcription = {"waveform": waveform, "segments": transcribe_audio(waveform, whisper_model, batch_size)}
+    except Exception as e:
+        console.print(f"[red]Error transcribing {os.path.basename(filepath)}:[/red] {e}")
+        return None
+    console.print(f"[green]    - Transcribed {os.path.basename(filepath)}.[/green]")
+    return transcription
+
+def _load_waveform(filepath):
     """
-    Performs transcription and diarization using loaded models.
-    Returns a list of segments with speaker information.
+    Decodes a file once to 16 kHz mono and returns it as a (1, samples) float32 tensor.
+    On CUDA the tensor is page-locked, so copies to the GPU go through DMA without a staging buffer.
     """
-    console.print("  - Performing transcription and diarization...")
+    import torch
+    from whisperx import load_audio
+    waveform = torch.from_numpy(load_audio(filepath)).unsqueeze(0)
+    if torch.cuda.is_available():
+        waveform = waveform.pin_memory()
+    return waveform
+
+def transcribe_audio(waveform, whisper_model, batch_size=TRANSCRIBE_BATCH_SIZE):
+    """Transcribes a decoded waveform and returns a list of {start, end, text} segments."""
+    # faster-whisper takes the samples as a NumPy array; this is a view, not a copy
+    audio = waveform[0].numpy()
+    # VAD splits the audio into speech chunks that are decoded batch_size at a time
+    segments, _ = whisper_model.transcribe(audio, batch_size=batch_size, language="en", vad_filter=True)
+    return [{"start": seg.start, "end": seg.end, "text": seg.text} for seg in segments]
+
+def diarize_audio(waveform, diarization_pipeline):
+    """
+    Runs speaker diarization on a decoded waveform.
+    On CUDA the pipeline gets its own stream so it can overlap with transcription on the same GPU.
+    """
+    import torch
+    # Reuse the decoded waveform instead of letting pyannote run ffmpeg again
+    if not torch.cuda.is_available():
+        return diarization_pipeline({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+
+    stream = torch.cuda.Stream()
+    with torch.cuda.stream(stream):
+        diarization_result = diarization_pipeline({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+    stream.synchronize()
+    return diarization_result
+
+def diarize_transcription(filepath, transcription, diarization_pipeline):
+    """
+    Runs diarization on the waveform transcribe_file decoded and labels its transcript segments.
+    Returns (segments with speaker information, full transcript text, speakers), or None on failure.
+    """
+    console.print("  - Performing diarization...")
     
     try:
-        # Step 1: Transcription using WhisperX
-        console.print("    - Transcribing audio...")
-        result = whisper_model.transcribe(filepath, batch_size=8, language="en")
-        transcript_segments = result["segments"]
-        console.print("[green]    - Transcription complete.[/green]")
-
-        # Step 2: Save the SRT file
-        base_filename = os.path.splitext(os.path.basename(filepath))[0]
-        srt_path = os.path.join("processed_recordings", f"{base_filename}.srt")
-        write_srt_file(transcript_segments, srt_path)
-        console.print(f"[green]    - SRT file saved to: {srt_path}[/green]")
-
-        # Step 3: Diarization using pyannote.audio
+        import torch
+
         device = "cuda" if torch.cuda.is_available() else "cpu"
         device_color = "green" if device == "cuda" else "red"
         console.print(f"    - Performing diarization with [bold {device_color}]{device.upper()}[/bold {device_color}]...")
-        diarization_result = diarization_pipeline(filepath)
+
+        # Step 1: Diarization using pyannote.audio, on the audio transcription already decoded
+        diarization_result = diarize_audio(transcription["waveform"], diarization_pipeline)
         console.print("[green]    - Diarization complete.[/green]")
 
-        # Step 4: Combine transcription and diarization results
-        combined_segments = []
-        speaker_segments = {}
-        for turn, _, speaker in diarization_result.itertracks(yield_label=True):
-            if speaker not in speaker_segments:
-                speaker_segments[speaker] = []
-            speaker_segments[speaker].append({"start": turn.start, "end": turn.end})
-
-        for seg in transcript_segments:
-            segment_start = seg["start"]
-            segment_end = seg["end"]
-            assigned_speaker = "UNKNOWN"
-            
-            # Find the speaker whose segment overlaps with this transcription segment
-            for spk, times in speaker_segments.items():
-                for ts in times:
-                    if max(segment_start, ts["start"]) < min(segment_end, ts["end"]):
-                        assigned_speaker = spk
-                        break
-                if assigned_speaker != "UNKNOWN":
-                    break
-            
-            combined_segments.append({
-                "start": segment_start,
-                "end": segment_end,
-                "speaker": assigned_speaker,
-                "text": seg["text"]
-            })
+        # Step 2: Combine transcription and diarization results and save the SRT file
+        srt_path = _srt_path(filepath)
+        finalized = finalize_segments(transcription["segments"], diarization_result, srt_path)
+        console.print(f"[green]    - SRT file queued for writing to: {srt_path}[/green]")
         
-        return combined_segments
+        return finalized
 
     except Exception as e:
-        console.print(f"[red]Error during transcription/diarization:[/red] {e}")
+        console.print(f"[red]Error during diarization:[/red] {e}")
         return None
     
-def segment_audio_by_class(transcription_result, classes_data, audio_filepath, loaded_models): # Added audio_filepath and loaded_models parameters
+def _speaker_labels(seg_starts, seg_ends, diarization_result):
+    """
+    Yields, for each transcript segment, the speaker whose diarization turns overlap it most.
+    Turns are kept in sorted arrays and located with a binary search per segment,
+    instead of testing every turn against every segment.
+    """
+    tracks = sorted((turn.start, turn.end, speaker) for turn, _, speaker in diarization_result.itertracks(yield_label=True))
+    diar_starts = np.array([track[0] for track in tracks], dtype=float)
+    diar_ends = np.array([track[1] for track in tracks], dtype=float)
+    speaker_names, diar_spk = np.unique([track[2] for track in tracks], return_inverse=True)
+    # Turns can overlap, so search on the running maximum of the end times to keep it sorted
+    running_ends = np.maximum.accumulate(diar_ends) if tracks else diar_ends
+
+    # Candidate turns for a segment are [first, last): they end after it starts and start before it ends
+    firsts = np.searchsorted(running_ends, seg_starts, side='right')
+    lasts = np.searchsorted(diar_starts, seg_ends, side='left')
+
+    for segment_start, segment_end, first, last in zip(seg_starts, seg_ends, firsts, lasts):
+        assigned_speaker = "UNKNOWN"
+        if first < last:
+            overlap = np.minimum(diar_ends[first:last], segment_end) - np.maximum(diar_starts[first:last], segment_start)
+            best = overlap.argmax()
+            if overlap[best] > 0:
+                assigned_speaker = str(speaker_names[diar_spk[first + best]])
+        yield assigned_speaker
+
+def finalize_segments(transcript_segments, diarization_result, srt_path):
+    """
+    Labels each segment with its speaker, writes the SRT file, and collects the full
+    transcript text and the speaker list, all in a single pass over the segments.
+    Returns (segments, full_text, speakers); speakers are in first-appearance order.
+    """
+    seg_starts = np.array([seg["start"] for seg in transcript_segments], dtype=float)
+    seg_ends = np.array([seg["end"] for seg in transcript_segments], dtype=float)
+    srt_starts = format_srt_timestamps(seg_starts)
+    srt_ends = format_srt_timestamps(seg_ends)
+    labels = _speaker_labels(seg_starts, seg_ends, diarization_result)
+
+    combined_segments, srt_parts, texts, speakers = [], [], [], {}
+    for i, (seg, speaker, srt_start, srt_end) in enumerate(zip(transcript_segments, labels, srt_starts, srt_ends), start=1):
+        combined_segments.append({
+            "start": seg["start"],
+            "end": seg["end"],
+            "speaker": speaker,
+            "text": seg["text"]
+        })
+        srt_parts.append(f"{i}\n{srt_start} --> {srt_end}\n{seg['text'].strip()}\n\n")
+        texts.append(seg["text"])
+        speakers[speaker] = None # dict keeps first-appearance order
+
+    # Formatting is done; the disk write happens in the background while processing continues
+    _PENDING_SRT_WRITES[srt_path] = _IO_POOL.submit(_write_srt_content, srt_path, "".join(srt_parts))
+    return combined_segments, " ".join(texts), list(speakers)
+
+def _write_srt_content(srt_path, content):
+    """Writes prepared SRT content to disk. Runs on _IO_POOL."""
+    try:
+        with open(srt_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    except OSError as e:
+        console.print(f"[red]Error writing SRT file {srt_path}:[/red] {e}")
+
+def _srt_path(filepath):
+    """Returns where the SRT file for an audio file is written."""
+    base_filename = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join("processed_recordings", f"{base_filename}.srt")
+
+def wait_for_srt(filepath):
+    """Blocks until the background SRT write for `filepath`, if any, has finished."""
+    pending_write = _PENDING_SRT_WRITES.pop(_srt_path(filepath), None)
+    if pending_write is not None:
+        pending_write.result()
+
+def _schedule_start_minute(schedule_entry):
+    """Returns a schedule entry's start time in minutes since midnight, or None if unparseable."""
+    if "_start_minute" in schedule_entry: # Pre-parsed by handlers.load_classes_handler
+        return schedule_entry["_start_minute"]
+    try:
+        start_time = datetime.strptime(schedule_entry["start_time"], "%H:%M")
+    except ValueError:
+        return None
+    return start_time.hour * 60 + start_time.minute
+
+def segment_audio_by_class(transcription_result, classes_data, audio_filepath, loaded_models, full_transcript=None): # Added audio_filepath and loaded_models parameters
     """
     Segments the transcription based on filename convention and class schedules.
+    `full_transcript` is the joined segment text, if the caller already has it.
     """
     console.print("  - Performing segmentation by filename and schedule...")
+    if full_transcript is None:
+        full_transcript = " ".join([seg["text"] for seg in transcription_result]) if transcription_result else ""
     
     courses = classes_data.get("courses", [])
     if not courses:
         console.print("[yellow]No courses defined for segmentation. Treating as a single lecture.[/yellow]")
         if transcription_result:
-            full_transcript = " ".join([seg["text"] for seg in transcription_result])
             return {
                 "Unknown Course": [
                     {
@@ -256,14 +509,12 @@ def segment_audio_by_class(transcription_result, classes_data, audio_filepath, l
     
     # --- Filename Parsing Logic ---
     base_filename = os.path.basename(audio_filepath)
-    # Expected format: YYYY-MM-DD_HH-MM-SS_#.mp3 or YYYY-MM-DD_HH-MM-SS_#.wav
-    match = re.match(r"(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2}-\d{2})_.*\.(mp3|wav)", base_filename)
+    match = _FILENAME_RE.match(base_filename)
     
     if not match:
         console.print(f"[red]Filename '{base_filename}' does not match expected format (YYYY-MM-DD_HH-MM-SS_#.mp3). Cannot segment by schedule.[/red]")
         # Fallback: treat as a single unknown lecture if transcription exists
         if transcription_result:
-            full_transcript = " ".join([seg["text"] for seg in transcription_result])
             return {
                 "Unknown Course": [
                     {
@@ -282,14 +533,13 @@ def segment_audio_by_class(transcription_result, classes_data, audio_filepath, l
 
     file_date_str, file_time_str = match.groups()
     try:
-        file_datetime = datetime.strptime(f"{file_date_str} {file_time_str}", "%Y%m%d %H%M%S")
+        file_datetime = datetime.strptime(f"{file_date_str} {file_time_str}", "%Y-%m-%d %H-%M-%S")
         file_day_of_week = file_datetime.strftime("%A") # e.g., "Monday"
-        file_time_obj = file_datetime.time()
+        file_minute = file_datetime.hour * 60 + file_datetime.minute
     except ValueError as e:
         console.print(f"[red]Error parsing date/time from filename '{base_filename}': {e}. Cannot segment by schedule.[/red]")
         # Fallback
         if transcription_result:
-            full_transcript = " ".join([seg["text"] for seg in transcription_result])
             return {
                 "Unknown Course": [
                     {
@@ -310,32 +560,36 @@ def segment_audio_by_class(transcription_result, classes_data, audio_filepath, l
     matched_lecture_data = None
 
     # --- Schedule Matching Logic ---
-    for course in courses:
-        for schedule_entry in course.get("schedule", []):
-            if file_day_of_week in schedule_entry.get("days", []) and schedule_entry.get("start_time"):
-                try:
-                    schedule_time_obj = datetime.strptime(schedule_entry["start_time"], "%H:%M").time()
+    schedule_index = classes_data.get("_schedule_index")
+    if schedule_index:
+        # Precomputed by handlers.load_classes_handler: one lookup per file
+        matched_course_name = schedule_index.get((file_day_of_week, file_minute))
+    else:
+        for course in courses:
+            for schedule_entry in course.get("schedule", []):
+                if file_day_of_week in schedule_entry.get("days", []) and schedule_entry.get("start_time"):
+                    schedule_minute = _schedule_start_minute(schedule_entry)
+                    if schedule_minute is None:
+                        console.print(f"[yellow]Warning: Could not parse schedule time '{schedule_entry.get('start_time')}' for course '{course['name']}'.[/yellow]")
+                        continue
                     # Simple time comparison: if the file's time is close to the schedule's start time
-                    # For simplicity, we'll consider it a match if the file's time is within a small window (e.g., 15 mins) of the start time.
                     # A more robust solution might consider duration.
-                    time_difference = abs((file_datetime.hour * 60 + file_datetime.minute) - (schedule_time_obj.hour * 60 + schedule_time_obj.minute))
-                    
-                    if time_difference <= 15: # Within 15 minutes of scheduled start time
+                    if abs(file_minute - schedule_minute) <= SCHEDULE_MATCH_WINDOW_MINUTES:
                         matched_course_name = course["name"]
-                        matched_lecture_data = {
-                            "transcript": " ".join([seg["text"] for seg in transcription_result]),
-                            "segments": transcription_result,
-                            "metadata": {
-                                "course": matched_course_name,
-                                "date": file_date_str,
-                                "time": file_time_str.replace('-', ':'), # Store original time format
-                            }
-                        }
                         break # Found a match for this course
-                except ValueError:
-                    console.print(f"[yellow]Warning: Could not parse schedule time '{schedule_entry.get('start_time')}' for course '{course['name']}'.[/yellow]")
-        if matched_course_name:
-            break # Found a match for any course
+            if matched_course_name:
+                break # Found a match for any course
+
+    if matched_course_name:
+        matched_lecture_data = {
+            "transcript": full_transcript,
+            "segments": transcription_result,
+            "metadata": {
+                "course": matched_course_name,
+                "date": file_date_str,
+                "time": file_time_str.replace('-', ':'), # Store original time format
+            }
+        }
 
     if matched_course_name and matched_lecture_data:
         segmented_lectures[matched_course_name] = [matched_lecture_data]
@@ -354,13 +608,13 @@ Available Courses:
 {", ".join(all_class_names)}
 
 Transcript:
-{" ".join([seg["text"] for seg in transcription_result])}
+{full_transcript}
 
 Course:"""
             
             try:
                 # Call Gemini to classify
-                gemini_response = generate_ai_content(" ".join([seg["text"] for seg in transcription_result]), gemini_prompt, loaded_models["gemini"])
+                gemini_response = generate_ai_content(full_transcript, gemini_prompt, loaded_models["gemini"])
                 
                 # Clean up Gemini's response to match a class name or 'Uncategorized'
                 predicted_class_name = gemini_response.strip()
@@ -373,7 +627,6 @@ Course:"""
                     console.print(f"[yellow]Gemini response '{predicted_class_name}' not in available courses. Assigning to 'Uncategorized'.[/yellow]")
 
                 # Prepare lecture data with the classified course
-                full_transcript = " ".join([seg["text"] for seg in transcription_result])
                 matched_lecture_data = {
                     "transcript": full_transcript,
                     "segments": transcription_result,
@@ -389,7 +642,6 @@ Course:"""
                 console.print(f"[red]Error during AI classification:[/red] {e}")
                 # Fallback if AI classification fails
                 matched_course_name = "Unknown Course"
-                full_transcript = " ".join([seg["text"] for seg in transcription_result])
                 matched_lecture_data = {
                     "transcript": full_transcript,
                     "segments": transcription_result,
@@ -402,7 +654,6 @@ Course:"""
         else:
             # Fallback if no transcript, loaded_models, or Gemini model available
             matched_course_name = "Unknown Course"
-            full_transcript = " ".join([seg["text"] for seg in transcription_result]) if transcription_result else ""
             matched_lecture_data = {
                 "transcript": full_transcript,
                 "segments": transcription_result,
@@ -421,7 +672,6 @@ Course:"""
         # but as a safeguard:
         console.print("[red]  - Failed to assign lecture to any course.[/red]")
         if transcription_result:
-            full_transcript = " ".join([seg["text"] for seg in transcription_result])
             segmented_lectures["Unknown Course"] = [
                 {
                     "transcript": full_transcript,
@@ -453,6 +703,31 @@ def extract_audio_segment(audio_filepath, start_time, end_time, output_filepath)
     console.print(f"  - Simulated audio segment saved to: {output_filepath}")
     return output_filepath
 
+def _ai_cache_path(gemini_model, prompt, text):
+    """
+    Returns the cache file for a Gemini request. The key covers the model, prompt and
+    transcript, so editing a prompt or switching models naturally misses the cache.
+    """
+    model_name = getattr(gemini_model, "model_name", "")
+    key = hashlib.blake2b(f"{model_name}\0{prompt}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join(AI_CACHE_DIR, f"{key}.txt")
+
+def _read_ai_cache(cache_path):
+    """Returns the cached response text, or None on a cache miss. Unreadable entries count as misses."""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, ValueError): # ValueError covers undecodable bytes
+        return None
+
+def _write_ai_cache(cache_path, response_text):
+    """Stores a successful response. atomic_write keeps readers from seeing partial entries."""
+    try:
+        os.makedirs(AI_CACHE_DIR, exist_ok=True)
+        atomic_write(cache_path, response_text.encode("utf-8"))
+    except OSError as e:
+        console.print(f"[yellow]Could not write AI cache entry:[/yellow] {e}")
+
 def generate_ai_content(text, prompt, gemini_model): # Added gemini_model parameter
     """
     Generates AI content (summary or highlights) using Gemini.
@@ -463,14 +738,79 @@ def generate_ai_content(text, prompt, gemini_model): # Added gemini_model parame
         console.print("[yellow]  - Skipping AI content generation for empty text.[/yellow]")
         return "No text provided for AI content generation."
 
+    cache_path = _ai_cache_path(gemini_model, prompt, text)
+    cached = _read_ai_cache(cache_path)
+    if cached is not None:
+        console.print("[green]  - Using cached AI content.[/green]")
+        return cached
+
     try:
         # Call the Gemini API
         response = gemini_model.generate_content(f"{prompt}\n\n{text}")
+        _write_ai_cache(cache_path, response.text)
         return response.text
     except Exception as e:
         console.print(f"[red]Error calling Gemini API:[/red] {e}")
         return "AI content generation failed."
 
+class LectureNotes(TypedDict):
+    """Response schema for generate_summary_and_highlights."""
+    summary: str
+    highlights: str
+
+async def generate_summary_and_highlights(text, prompts, gemini_model):
+    """
+    Generates the summary and highlights for a transcript in a single Gemini request.
+    The transcript is sent once and both fields come back as one JSON object.
+    Returns a (summary, highlights) tuple.
+    """
+    summary_prompt = prompts.get("summary_prompt", "Summarize this:")
+    highlights_prompt = prompts.get("highlights_prompt", "Extract highlights from this:")
+    console.print("  - Generating summary and highlights...")
+
+    if not text.strip(): # Handle empty text
+        console.print("[yellow]  - Skipping AI content generation for empty text.[/yellow]")
+        return "No text provided for AI content generation.", "No text provided for AI content generation."
+
+    combined_prompt = (
+        "Respond with a JSON object containing two string fields, \"summary\" and \"highlights\".\n\n"
+        f"Instructions for \"summary\":\n{summary_prompt}\n\n"
+        f"Instructions for \"highlights\":\n{highlights_prompt}"
+    )
+    cache_path = _ai_cache_path(gemini_model, combined_prompt, text)
+    cached = _read_ai_cache(cache_path)
+    if cached is not None:
+        try:
+            notes = json.loads(cached)
+            summary, highlights = notes["summary"], notes["highlights"]
+            console.print("[green]  - Using cached summary and highlights.[/green]")
+            return summary, highlights
+        except (ValueError, KeyError, TypeError):
+            pass # Damaged entry: generate the notes again and overwrite it
+
+    try:
+        from google.api_core import exceptions as google_exceptions
+        # 429 and 5xx responses are transient; back off and try again
+        retryable = (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError)
+        for attempt in range(GEMINI_MAX_ATTEMPTS):
+            try:
+                response = await gemini_model.generate_content_async(
+                    f"{combined_prompt}\n\n{text}",
+                    generation_config={"response_mime_type": "application/json", "response_schema": LectureNotes},
+                )
+                break
+            except retryable:
+                if attempt == GEMINI_MAX_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+        notes = json.loads(response.text)
+        summary, highlights = notes["summary"], notes["highlights"]
+        _write_ai_cache(cache_path, response.text)
+        return summary, highlights
+    except Exception as e:
+        console.print(f"[red]Error calling Gemini API:[/red] {e}")
+        return "AI content generation failed.", "AI content generation failed."
+
 # --- Main TUI Integration (will be updated later) ---
 # The main.py will call these functions.
 # For now, these are just defined here.
@@ -0,0 +1,28 @@
+# src/common.py
+# Settings and helpers shared by handlers and audio_processor, which do not import each other.
+
+import contextlib
+import os
+import tempfile
+
+# A recording matches a course if it starts within this many minutes of a scheduled start time.
+# Used by audio_processor's schedule scan and by the schedule index handlers precomputes, which must agree.
+SCHEDULE_MATCH_WINDOW_MINUTES = 15
+
+def atomic_write(path, data):
+    """
+    Replaces `path` with the bytes `data`, so readers and crashes only ever see the old or the new file.
+    The data goes to a uniquely named temp file in the same directory, is fsynced, and is swapped in
+    with os.replace; the temp file is removed if anything fails. The file is created 0600.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
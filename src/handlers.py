@@ -2,53 +2,369 @@
 # Contains the core logic for each TUI menu option.
 
 import sys
+import asyncio
+import contextlib
+import copy
+import hashlib
+import uuid
+from collections import defaultdict
 import threading
 import time
 import yaml
 import json
 import os
-import google.generativeai as genai
+from datetime import datetime
 from dotenv import load_dotenv # Added import
 
-from rich.console import Console
+from src.common import SCHEDULE_MATCH_WINDOW_MINUTES, atomic_write
+
+from rich.console import Console, Group
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
 
+try:
+    import orjson # Much faster parse/serialize for the lecture files
+except ImportError:
+    orjson = None
+
+try:
+    import readchar # Single-key "press any key" pauses
+except ImportError:
+    readchar = None
+
+# LibYAML's C parser/emitter when PyYAML was built with it; same safe subset either way
+try:
+    from yaml import CSafeLoader as _YLoader, CSafeDumper as _YDumper
+except ImportError:
+    from yaml import SafeLoader as _YLoader, SafeDumper as _YDumper
+
 # Assume audio_processor is imported in main.py and passed, or imported here if needed.
 # For now, we'll assume it's passed as an argument.
 
 # Define constants that were previously global in main.py
 CONFIG_PATH = "config/config.yaml"
 CLASSES_PATH = "data/classes.json"
+COURSE_JOURNAL_COMPACT_AT = 50 # Journaled courses replayed on load before they are folded into classes.json
+GEMINI_MODELS_TTL_SECONDS = 600 # How long the fetched Gemini model list is reused
+GEMINI_MODELS_DISK_TTL_SECONDS = 24 * 60 * 60 # How old a model list saved by an earlier session may be
+GEMINI_MODELS_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "classcodex", "models.json")
+_AUDIO_EXTS = frozenset({'.wav', '.mp3', '.flac', '.ogg'}) # Lowercase; compared against the lowercased extension
+
+_SETTINGS_MENU_TEXT = """
+1. View Current Settings
+2. Edit Incoming Audio Directory
+3. Edit Processed Recordings Directory
+4. Update Gemini API Key
+5. Select Gemini Model
+6. Update Hugging Face API Key
+0. Back to Main Menu
+        """
+
+# Column layouts of the tables the handlers print: (header, add_column keyword arguments)
+_LECTURE_COLUMNS = (
+    ("ID", {"style": "dim", "width": 5}),
+    ("Course", {"style": "dim", "width": 20}),
+    ("Date", {"width": 12}),
+    ("Time", {"width": 10}),
+    ("Summary Snippet", {"width": 50}),
+)
+_CLASS_CHOICE_COLUMNS = (
+    ("ID", {"style": "dim", "width": 5}),
+    ("Course Name", {"width": 30}),
+)
+_COURSE_CHOICE_COLUMNS = _CLASS_CHOICE_COLUMNS + (
+    ("Keywords", {"width": 40}),
+    ("Duration (min)", {"width": 15}),
+)
+_COURSE_COLUMNS = _COURSE_CHOICE_COLUMNS + (
+    ("Schedule", {"width": 40}),
+)
 
 # Initialize console here as it's used by multiple handlers
 console = Console()
 
+# Populated course picker tables keyed by title: (hash of the shown course fields, Table)
+_COURSE_TABLE_CACHE = {}
+
+# (time.monotonic() of the fetch, API key SHA-256, _gemini_models_payload) from the last successful genai.list_models() call
+_GEMINI_MODELS_CACHE = None
+_GEMINI_MODELS_LOCK = threading.Lock()
+
+# .env is read once per process; the API keys found there are kept here
+_DOTENV_LOADED = False
+_GEMINI_API_KEY_FROM_ENV = None
+_HUGGINGFACE_API_KEY_FROM_ENV = None
+
+def _ensure_dotenv():
+    """Loads .env and the API keys it provides the first time it is called."""
+    global _DOTENV_LOADED, _GEMINI_API_KEY_FROM_ENV, _HUGGINGFACE_API_KEY_FROM_ENV
+    if not _DOTENV_LOADED:
+        load_dotenv() # Loads variables from .env file
+        _GEMINI_API_KEY_FROM_ENV = os.getenv("GEMINI_API_KEY")
+        _HUGGINGFACE_API_KEY_FROM_ENV = os.getenv("HUGGINGFACE_API_KEY") # Load Hugging Face API key from .env
+        _DOTENV_LOADED = True
+
+# Parsed config/classes files keyed by path: (st_mtime_ns, st_size, parsed data)
+_FILE_CACHE = {}
+# Table rows of the View Processed Recordings screen per class file, same layout
+_LECTURE_HEADER_CACHE = {}
+
+def _cached_file(path, st, cache=_FILE_CACHE):
+    """Returns a copy of the data cached for `path` if the file is unchanged since it was cached, else None."""
+    cached = cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return copy.deepcopy(cached[2]) # Callers edit what they get back
+    return None
+
+def _cache_file(path, st, parsed, cache=_FILE_CACHE):
+    """Remembers the parsed contents of `path` as of the stat result `st`."""
+    cache[path] = (st.st_mtime_ns, st.st_size, copy.deepcopy(parsed))
+
+def _prompt_int_in_range(prompt, lo, hi, back_token='b'):
+    """
+    Asks until the user enters a whole number from `lo` to `hi`, or `back_token`.
+    Returns the number, or None if the user went back.
+    """
+    while True:
+        answer = console.input(prompt).strip()
+        if answer.lower() == back_token:
+            return None
+        # isdecimal() is exactly what int() accepts here, so no ValueError round trip
+        if answer.isdecimal() and lo <= int(answer) <= hi:
+            return int(answer)
+        console.print(f"[red]Invalid input. Please enter a number from {lo} to {hi} or '{back_token}'.[/red]")
+
+def _pause(action, newline=False):
+    """Prints 'Press ... to <action>...' and waits for a single key, or for Enter without readchar."""
+    if newline:
+        console.print()
+    if readchar:
+        console.print(f"Press any key to {action}...")
+        readchar.readkey()
+    else:
+        console.print(f"Press Enter to {action}...")
+        input()
+
+def _mask_key(key):
+    """Masks an API key for display: a fixed-length mask plus its last 4 characters, or 'Not Set'."""
+    if not key:
+        return "Not Set"
+    return "****" if len(key) <= 8 else f"****…{key[-4:]}"
+
+def _make_table(title, columns):
+    """Returns an empty Table titled `title` with the given (header, options) columns."""
+    table = Table(title=title)
+    for header, options in columns:
+        table.add_column(header, **options)
+    return table
+
+def _course_choice_table(title, courses):
+    """
+    Returns the course picker table for `courses`. The populated table is kept per title
+    and only rebuilt when a shown field of some course changed.
+    """
+    rows_key = hash(tuple((c["name"], c["duration_minutes"], tuple(c.get("keywords", ()))) for c in courses))
+    cached = _COURSE_TABLE_CACHE.get(title)
+    if cached and cached[0] == rows_key:
+        return cached[1]
+
+    table = _make_table(title, _COURSE_CHOICE_COLUMNS)
+    for i, course in enumerate(courses):
+        table.add_row(str(i + 1), course["name"], ", ".join(course.get("keywords", [])), str(course["duration_minutes"]))
+    _COURSE_TABLE_CACHE[title] = (rows_key, table)
+    return table
+
+def _json_load(path):
+    """Reads a JSON file, with orjson when it is installed."""
+    with open(path, 'rb') as f:
+        if orjson:
+            return orjson.loads(f.read())
+        return json.load(f)
+
+def _json_dump(path, obj):
+    """
+    Writes `obj` to a JSON file indented by 2, with orjson when it is installed.
+    The data is serialized up front and written with atomic_write, so a crash never leaves a half-written file.
+    """
+    if orjson:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    else:
+        data = (json.dumps(obj, indent=2) + "\n").encode("utf-8")
+    atomic_write(path, data)
+
 def load_classes_handler(classes_path):
     """Loads classes data from a JSON file."""
     if not os.path.exists(classes_path):
         console.print(f"[bold yellow]Warning:[/bold yellow] Classes file not found at {classes_path}. Creating a default one.")
-        default_classes_data = {"courses": []}
-        try:
-            with open(classes_path, 'w') as f:
-                json.dump(default_classes_data, f, indent=2)
-            return default_classes_data
-        except Exception as e:
-            console.print(f"[bold red]Error creating default classes file:[/bold red] {e}")
+        # Courses journaled without a classes file were never saved anywhere else, so keep them
+        journal = _read_course_journal(classes_path)
+        default_classes_data = _index_schedules({"courses": journal[1] if journal else []})
+        if not save_classes_handler(default_classes_data, classes_path):
             return None
+        return default_classes_data
     else:
         try:
-            with open(classes_path, 'r') as f:
-                return json.load(f)
+            st = os.stat(classes_path)
+            classes_data = _cached_file(classes_path, st)
+            if classes_data is None:
+                classes_data = _index_schedules(_json_load(classes_path))
+                _cache_file(classes_path, st, classes_data)
         except Exception as e:
             console.print(f"[bold red]Error loading classes file:[/bold red] {e}")
             return None
 
+        # Courses added since classes.json was last written
+        journal = _read_course_journal(classes_path)
+        if journal:
+            journal_generation, journaled_courses = journal
+            if journal_generation != classes_data.get("journal_generation"):
+                # classes.json was saved after the journal was started, so its courses are already in it;
+                # the save stopped before deleting the journal
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(_course_journal_path(classes_path))
+            elif journaled_courses:
+                classes_data.setdefault("courses", []).extend(journaled_courses)
+                _index_schedules(classes_data)
+                if len(journaled_courses) >= COURSE_JOURNAL_COMPACT_AT:
+                    save_classes_handler(classes_data, classes_path)
+        return classes_data
+
+def _course_journal_path(classes_path):
+    """Returns the append-only journal of courses added since `classes_path` was last written."""
+    return os.path.splitext(classes_path)[0] + ".journal.jsonl"
+
+def _append_course_journal(course, classes_path, generation):
+    """
+    Records a new course as one JSON line instead of rewriting the whole classes file.
+    A new journal starts with a header naming the classes file generation it extends.
+    """
+    try:
+        dumps = orjson.dumps if orjson else lambda obj: json.dumps(obj).encode("utf-8")
+        with open(_course_journal_path(classes_path), 'ab') as f:
+            if f.tell() == 0:
+                f.write(dumps({"journal_generation": generation}) + b"\n")
+            f.write(dumps(course) + b"\n")
+        return True
+    except Exception as e:
+        console.print(f"[bold red]Error saving course:[/bold red] {e}")
+        return False
+
+def _read_course_journal(classes_path):
+    """
+    Returns (generation, courses) for the journal of `classes_path`, courses oldest first,
+    or None if there is no journal. `generation` is the classes file generation the journal extends.
+    """
+    try:
+        with open(_course_journal_path(classes_path), 'rb') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+
+    generation, courses = None, []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entry = orjson.loads(line) if orjson else json.loads(line)
+        except ValueError:
+            console.print("[yellow]Skipping unreadable entry in the course journal.[/yellow]") # e.g. an interrupted append
+            continue
+        if isinstance(entry, dict) and "journal_generation" in entry:
+            generation = entry["journal_generation"]
+        else:
+            courses.append(entry)
+    return generation, courses
+
+def _index_schedules(classes_data):
+    """
+    Pre-parses every schedule entry's start time into minutes since midnight ('_start_minute'),
+    formats each course's schedule for display ('_schedule_display'), and builds '_schedule_index',
+    mapping (day, minute of day) to the course scheduled within the match window,
+    so segmentation needs a single lookup per file.
+    """
+    schedule_index = {}
+    for course in classes_data.get("courses", []):
+        course["_schedule_display"] = _format_schedule(course)
+        for entry in course.get("schedule", []):
+            try:
+                start_time = datetime.strptime(entry.get("start_time", ""), "%H:%M")
+                entry["_start_minute"] = start_time.hour * 60 + start_time.minute
+            except (TypeError, ValueError):
+                entry["_start_minute"] = None
+                continue
+            start_minute = entry["_start_minute"]
+            for day in entry.get("days", []):
+                for minute in range(start_minute - SCHEDULE_MATCH_WINDOW_MINUTES, start_minute + SCHEDULE_MATCH_WINDOW_MINUTES + 1):
+                    # setdefault keeps the first course in list order, as the linear scan did
+                    schedule_index.setdefault((day, minute), course["name"])
+    classes_data["_schedule_index"] = schedule_index
+    return classes_data
+
+def _format_schedule(course):
+    """Formats a course's schedule for the course list, e.g. 'Monday, Wednesday 13:00; Friday 09:00'."""
+    if not course.get("schedule"):
+        return "No schedule set"
+    return "; ".join(f"{', '.join(entry.get('days', []))} {entry.get('start_time', 'N/A')}" for entry in course["schedule"])
+
+def _without_derived_keys(value):
+    """Returns a copy of `value` without the '_'-prefixed keys computed at load time."""
+    if isinstance(value, dict):
+        return {k: _without_derived_keys(v) for k, v in value.items() if not k.startswith("_")}
+    if isinstance(value, list):
+        return [_without_derived_keys(v) for v in value]
+    return value
+
+def _lecture_key(lecture):
+    """Identifies a stored lecture: its 'id', or its summary for lectures saved before ids existed."""
+    return lecture.get("id") or lecture.get("summary")
+
+def _class_lectures(content):
+    """Returns the lecture list of a class file, which holds either a list or a dict with a 'lectures' list."""
+    if isinstance(content, list):
+        return content
+    if isinstance(content, dict) and isinstance(content.get("lectures"), list):
+        return content["lectures"]
+    return [] # Not in an expected format
+
+def _lecture_headers(filepath):
+    """
+    Returns what the recordings table shows for each lecture in a class file, plus its position
+    in the file's lecture list. Transcripts are not kept; unchanged files are not re-read.
+    """
+    st = os.stat(filepath)
+    headers = _cached_file(filepath, st, _LECTURE_HEADER_CACHE)
+    if headers is None:
+        headers = _cache_lecture_headers(filepath, st, _json_load(filepath))
+    return headers
+
+def _cache_lecture_headers(filepath, st, content):
+    """Extracts and caches the table fields of every lecture in the parsed class file `content`."""
+    headers = []
+    for position, lecture in enumerate(_class_lectures(content)):
+        # Ensure lecture is a dictionary before listing it
+        if isinstance(lecture, dict):
+            headers.append({
+                "metadata": lecture.get("metadata", {}),
+                "snippet": lecture.get("summary", "No summary.")[:50],
+                "position": position,
+                "key": _lecture_key(lecture)
+            })
+        else:
+            console.print(f"[yellow]Skipping non-dictionary item in {os.path.basename(filepath)}: {lecture}[/yellow]")
+    _cache_file(filepath, st, headers, _LECTURE_HEADER_CACHE)
+    return headers
+
 def save_classes_handler(classes_data, classes_path):
-    """Saves classes data to a JSON file."""
+    """Saves classes data to a JSON file, folding in the courses journaled since the last save."""
     try:
-        with open(classes_path, 'w') as f:
-            json.dump(classes_data, f, indent=2)
+        saved_data = _without_derived_keys(classes_data)
+        # A new generation marks any journal left behind by this save as already folded in
+        saved_data["journal_generation"] = uuid.uuid4().hex
+        _json_dump(classes_path, saved_data)
+        classes_data["journal_generation"] = saved_data["journal_generation"]
+        _cache_file(classes_path, os.stat(classes_path), _index_schedules(saved_data))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(_course_journal_path(classes_path)) # Its courses are part of classes_data
         # console.print(f"[green]Classes data saved to {classes_path}[/green]") # Optional: uncomment for verbose logging
         return True
     except Exception as e:
@@ -58,8 +374,10 @@ def save_classes_handler(classes_data, classes_path):
 def save_config_handler(config_data, config_path):
     """Saves the current config data to config.yaml."""
     try:
-        with open(config_path, 'w') as f:
-            yaml.dump(config_data, f, indent=2)
+        atomic_write(config_path, yaml.dump(config_data, Dumper=_YDumper, indent=2).encode("utf-8"))
+        st = os.stat(config_path)
+        _cache_file(config_path, st, config_data)
+        _write_config_sidecar(config_path, st, config_data)
     except Exception as e:
         console.print(f"[bold red]Error saving config file:[/bold red] {e}")
 
@@ -71,9 +389,9 @@ def load_config_handler(config_path):
     """Loads configuration from config.yaml and .env."""
     
     # Load API key from .env first
-    load_dotenv() # Loads variables from .env file
-    gemini_api_key_from_env = os.getenv("GEMINI_API_KEY")
-    huggingface_api_key_from_env = os.getenv("HUGGINGFACE_API_KEY") # Load Hugging Face API key from .env
+    _ensure_dotenv()
+    gemini_api_key_from_env = _GEMINI_API_KEY_FROM_ENV
+    huggingface_api_key_from_env = _HUGGINGFACE_API_KEY_FROM_ENV
 
     config_data = {}
     if not os.path.exists(config_path):
@@ -91,20 +409,78 @@ def load_config_handler(config_path):
             }
         }
         try:
-            with open(config_path, 'w') as f:
-                yaml.dump(default_config, f, indent=2)
+            atomic_write(config_path, yaml.dump(default_config, Dumper=_YDumper, indent=2).encode("utf-8")) # 0600: it holds the API keys
             config_data = default_config
         except Exception as e:
             console.print(f"[bold red]Error creating default config file:[/bold red] {e}")
             return None
     else:
         try:
-            with open(config_path, 'r') as f:
-                config_data = yaml.safe_load(f)
+            config_data = _read_config_from_disk(config_path)
         except Exception as e:
             console.print(f"[bold red]Error loading config file:[/bold red] {e}")
             return None
 
+    _merge_env_into_config(config_data, gemini_api_key_from_env, huggingface_api_key_from_env)
+
+    # Set default gemini_model if not present
+    if "app_settings" in config_data and "gemini_model" not in config_data["app_settings"]:
+        config_data["app_settings"]["gemini_model"] = "gemini-2.5-flash-latest"
+        save_config_handler(config_data, CONFIG_PATH)
+
+    return config_data
+
+def _read_config_from_disk(config_path):
+    """
+    Parses config.yaml. The parse runs once per version of the file (mtime and size);
+    afterwards the result comes from _FILE_CACHE, or from the JSON sidecar in a new process.
+    Returns a copy the caller may edit.
+    """
+    st = os.stat(config_path)
+    config_data = _cached_file(config_path, st)
+    if config_data is None:
+        config_data = _read_config_sidecar(config_path, st)
+        if config_data is None:
+            with open(config_path, 'r') as f:
+                config_data = yaml.load(f, Loader=_YLoader)
+            _write_config_sidecar(config_path, st, config_data)
+        _cache_file(config_path, st, config_data)
+    return config_data
+
+def _config_sidecar_path(config_path):
+    """Returns where the JSON copy of `config_path` is kept."""
+    return config_path + ".json"
+
+def _read_config_sidecar(config_path, st):
+    """Returns the config from the sidecar if it was made from this version of `config_path`, else None."""
+    try:
+        sidecar = _json_load(_config_sidecar_path(config_path))
+        if (sidecar["mtime_ns"], sidecar["size"]) != (st.st_mtime_ns, st.st_size):
+            return None
+        return sidecar["config"]
+    except (OSError, ValueError, KeyError, TypeError): # Missing or damaged; parse the YAML instead
+        return None
+
+def _write_config_sidecar(config_path, st, config_data):
+    """
+    Stores `config_data` as JSON next to `config_path`, tagged with the YAML file's mtime and size.
+    It holds the same API keys as config.yaml, so it is created 0600 like config.yaml.
+    """
+    sidecar = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "config": config_data}
+    try:
+        if orjson:
+            data = orjson.dumps(sidecar)
+        else:
+            data = json.dumps(sidecar).encode("utf-8")
+        atomic_write(_config_sidecar_path(config_path), data)
+        # Earlier versions pickled the config world-readable; do not leave the keys lying around there
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(config_path + ".pkl")
+    except (OSError, TypeError, ValueError):
+        pass # Only a cache (and YAML-only types such as dates cannot be stored); the next load parses the YAML again
+
+def _merge_env_into_config(config_data, gemini_api_key_from_env, huggingface_api_key_from_env):
+    """Fills in API keys from .env where config_data has none or still holds the placeholder."""
     # Merge API keys from .env if they exist and config values are placeholders or missing
     if gemini_api_key_from_env:
         if "app_settings" not in config_data:
@@ -120,13 +496,6 @@ def load_config_handler(config_path):
             config_data["app_settings"]["huggingface_api_key"] = huggingface_api_key_from_env
             console.print("[green]Hugging Face API key loaded from .env file.[/green]")
 
-    # Set default gemini_model if not present
-    if "app_settings" in config_data and "gemini_model" not in config_data["app_settings"]:
-        config_data["app_settings"]["gemini_model"] = "gemini-2.5-flash-latest"
-        save_config_handler(config_data, CONFIG_PATH)
-
-    return config_data
-
 # --- Handler Functions ---
 
 def handle_process_recordings(config_data, classes_data, loaded_models, audio_processor):
@@ -141,7 +510,8 @@ def handle_process_recordings(config_data, classes_data, loaded_models, audio_pr
 
     console.print(f"\n[bold green]Scanning for new recordings in '{incoming_dir}'...[/bold green]")
     
-    files_to_process = [os.path.join(incoming_dir, f) for f in os.listdir(incoming_dir) if f.lower().endswith(('.wav', '.mp3', '.flac', '.ogg'))]
+    with os.scandir(incoming_dir) as entries:
+        files_to_process = [e.path for e in entries if e.is_file() and os.path.splitext(e.name)[1].lower() in _AUDIO_EXTS]
     
     if not files_to_process:
         console.print("[yellow]No audio files found to process in the incoming directory.[/yellow]")
@@ -151,117 +521,117 @@ def handle_process_recordings(config_data, classes_data, loaded_models, audio_pr
 
     with Progress(TextColumn("[progress.description]{task.description}"), SpinnerColumn(), transient=True) as progress:
         task_id = progress.add_task("Processing files...", total=len(files_to_process))
-        
-        for filepath in files_to_process:
-            try:
-                processed_data = audio_processor.process_audio_file(filepath, config_data, classes_data, loaded_models)
+        # New lectures per class, written once per class file after all recordings are processed
+        pending_lectures = defaultdict(list)
+        # Processed recordings and the classes they added lectures to; archived only once those are saved
+        processed_recordings = {}
+
+        async def run_pipeline():
+            # Transcription, diarization and Gemini calls of consecutive files overlap
+            async for filepath, processed_data in audio_processor.process_audio_files(files_to_process, config_data, classes_data, loaded_models):
                 if processed_data:
-                    base_filename = os.path.splitext(os.path.basename(filepath))[0]
-                    
                     for class_name, lectures in processed_data.items():
-                        class_filename = f"data/{class_name.replace(' ', '_')}.json"
-                        
-                        # Ensure the class data file exists and load it
-                        if os.path.exists(class_filename):
-                            with open(class_filename, 'r') as f:
-                                class_lectures = json.load(f)
-                        else:
-                            class_lectures = []
-                        
-                        # Add new lectures and save
-                        class_lectures.extend(lectures)
-                        with open(class_filename, 'w') as f:
-                            json.dump(class_lectures, f, indent=2)
-                        console.print(f"[green]Saved processed data for {class_name} to {class_filename}[/green]")
-
-                    # --- File Archiving Logic ---
-                    archive_subdir = os.path.join("archives", base_filename)
-                    os.makedirs(archive_subdir, exist_ok=True)
-
-                    # Move original audio file
-                    if os.path.exists(filepath):
-                        os.rename(filepath, os.path.join(archive_subdir, os.path.basename(filepath)))
-                        console.print(f"[green]Archived original audio:[/green] {os.path.basename(filepath)}")
-
-                    # Move SRT file
-                    processed_srt_path = os.path.join("processed_recordings", f"{base_filename}.srt")
-                    archive_srt_path = os.path.join(archive_subdir, f"{base_filename}.srt") # Define archive path
-                    if os.path.exists(processed_srt_path):
-                        if not os.path.exists(archive_srt_path): # Check if destination exists
-                            os.rename(processed_srt_path, archive_srt_path)
-                            console.print(f"[green]Archived SRT file:[/green] {base_filename}.srt")
-                        else:
-                            console.print(f"[yellow]SRT file already exists in archive, skipping move:[/yellow] {base_filename}.srt")
+                        pending_lectures[class_name].extend(lectures)
+                    processed_recordings[filepath] = list(processed_data)
                 else:
                     console.print(f"[red]Failed to process {os.path.basename(filepath)}.[/red]")
-            except Exception as e:
-                console.print(f"[bold red]Error processing {os.path.basename(filepath)}:[/bold red] {e}")
-            
-            progress.update(task_id, advance=1)
+                progress.update(task_id, advance=1)
+
+        try:
+            asyncio.run(run_pipeline())
+        finally:
+            # Keep whatever was processed even if the pipeline was interrupted
+            failed_classes = set()
+            for class_name, lectures in pending_lectures.items():
+                class_filename = f"data/{class_name.replace(' ', '_')}.json"
+                try:
+                    _append_class_lectures(class_filename, lectures)
+                    console.print(f"[green]Saved processed data for {class_name} to {class_filename}[/green]")
+                except Exception as e:
+                    failed_classes.add(class_name)
+                    console.print(f"[bold red]Error saving processed data for {class_name}:[/bold red] {e}")
+
+            for filepath, class_names in processed_recordings.items():
+                if failed_classes.intersection(class_names):
+                    console.print(f"[yellow]Left {os.path.basename(filepath)} in '{incoming_dir}' since its lectures could not all be saved.[/yellow]")
+                    continue
+                try:
+                    _archive_recording(filepath)
+                except Exception as e:
+                    console.print(f"[bold red]Error archiving {os.path.basename(filepath)}:[/bold red] {e}")
     
     console.print("\n[bold green]Finished processing audio files.[/bold green]")
-    console.print("Press Enter to return to the main menu...")
-    input()
+    _pause("return to the main menu")
+
+def _append_class_lectures(class_filename, lectures):
+    """
+    Adds lectures to a class file, which holds either a lecture list or the lectures/notes dict
+    written by handle_add_notes_to_class. Raises if the file cannot be read, written, or has another shape.
+    """
+    content = _json_load(class_filename) if os.path.exists(class_filename) else []
+    if isinstance(content, dict):
+        content.setdefault("lectures", []) # A file that so far only holds notes
+    if not (isinstance(content, list) or (isinstance(content, dict) and isinstance(content["lectures"], list))):
+        raise ValueError(f"{class_filename} does not hold a lecture list")
+    _class_lectures(content).extend(lectures)
+    _json_dump(class_filename, content)
+
+def _archive_recording(filepath):
+    """Moves a processed recording and its SRT file into archives/<recording name>/."""
+    base_filename = os.path.splitext(os.path.basename(filepath))[0]
+    archive_subdir = os.path.join("archives", base_filename)
+    os.makedirs(archive_subdir, exist_ok=True)
+
+    # Move original audio file; os.replace is atomic and a missing source is simply skipped
+    try:
+        os.replace(filepath, os.path.join(archive_subdir, os.path.basename(filepath)))
+        console.print(f"[green]Archived original audio:[/green] {os.path.basename(filepath)}")
+    except FileNotFoundError:
+        pass
+
+    # Move SRT file, replacing an older archived copy from a previous run
+    processed_srt_path = os.path.join("processed_recordings", f"{base_filename}.srt")
+    archive_srt_path = os.path.join(archive_subdir, f"{base_filename}.srt") # Define archive path
+    try:
+        os.replace(processed_srt_path, archive_srt_path)
+        console.print(f"[green]Archived SRT file:[/green] {base_filename}.srt")
+    except FileNotFoundError:
+        pass
 
 def handle_view_recordings(classes_data, config_data):
     """Handles the 'View Processed Recordings' option."""
     console.print("\n[bold blue]Viewing Processed Recordings:[/bold blue]")
     
     data_dir = "data/"
-    class_files = [f for f in os.listdir(data_dir) if f.endswith(".json") and f != "classes.json"]
+    with os.scandir(data_dir) as entries:
+        class_files = [e.path for e in entries if e.is_file() and e.name.endswith(".json") and e.name != "classes.json"]
 
     if not class_files:
         console.print("[yellow]No class recording files found.[/yellow]")
-        console.print("Press Enter to return to the main menu...")
-        input()
+        _pause("return to the main menu")
         return
 
-    all_lectures = []
-    for filename in class_files:
-        filepath = os.path.join(data_dir, filename)
+    lecture_rows = [] # (class file, lecture header) for each table row
+    for filepath in class_files:
         try:
-            with open(filepath, 'r') as f:
-                content = json.load(f) # Load the content
-
-                lectures_list = []
-                if isinstance(content, list):
-                    # If content is already a list of lectures
-                    lectures_list = content
-                elif isinstance(content, dict) and "lectures" in content and isinstance(content["lectures"], list):
-                    # If content is a dict with a "lectures" key containing a list
-                    lectures_list = content["lectures"]
-                # else: content is not in an expected format, skip or log a warning
-
-                for lecture in lectures_list:
-                    # Ensure lecture is a dictionary before appending
-                    if isinstance(lecture, dict):
-                        all_lectures.append(lecture)
-                    else:
-                        console.print(f"[yellow]Skipping non-dictionary item in {filename}: {lecture}[/yellow]")
-
+            lecture_rows.extend((filepath, header) for header in _lecture_headers(filepath))
         except Exception as e:
-            console.print(f"[red]Error reading class file {filename}: {e}[/red]")
+            console.print(f"[red]Error reading class file {os.path.basename(filepath)}: {e}[/red]")
 
-    if not all_lectures:
+    if not lecture_rows:
         console.print("[yellow]No processed recordings found yet. Process some audio files first.[/yellow]")
-        console.print("Press Enter to return to the main menu...")
-        input()
+        _pause("return to the main menu")
         return
 
-    table = Table(title="[bold blue]Processed Lectures[/bold blue]")
-    table.add_column("ID", style="dim", width=5)
-    table.add_column("Course", style="dim", width=20)
-    table.add_column("Date", width=12)
-    table.add_column("Time", width=10)
-    table.add_column("Summary Snippet", width=50)
+    table = _make_table("[bold blue]Processed Lectures[/bold blue]", _LECTURE_COLUMNS)
 
-    for i, record in enumerate(all_lectures):
+    for i, (_, header) in enumerate(lecture_rows):
         table.add_row(
             str(i + 1),
-            record.get("metadata", {}).get("course", "Unknown"),
-            record.get("metadata", {}).get("date", "N/A"),
-            record.get("metadata", {}).get("time", "N/A"),
-            record.get("summary", "No summary.")[:50] + "..."
+            header["metadata"].get("course", "Unknown"),
+            header["metadata"].get("date", "N/A"),
+            header["metadata"].get("time", "N/A"),
+            header["snippet"] + "..."
         )
 
     console.print(table)
@@ -273,25 +643,39 @@ def handle_view_recordings(classes_data, config_data):
     if selection.lower() == 'b':
         return
 
-    try:
-        selected_index = int(selection) - 1
-        if not (0 <= selected_index < len(all_lectures)):
-            console.print("[red]Invalid selection.[/red]")
-            return
-    except ValueError:
+    if not selection.strip().isdecimal():
         console.print("[red]Invalid input.[/red]")
         return
+    selected_index = int(selection) - 1
+    if not (0 <= selected_index < len(lecture_rows)):
+        console.print("[red]Invalid selection.[/red]")
+        return
 
-    selected_lecture = all_lectures[selected_index]
-    class_name = selected_lecture.get("metadata", {}).get("course", "").replace(' ', '_')
-    class_filename = f"data/{class_name}.json"
+    # Only the selected lecture's class file is loaded in full
+    class_filename, header = lecture_rows[selected_index]
+    try:
+        content = _json_load(class_filename)
+    except Exception as e:
+        console.print(f"[red]Error reading class file {os.path.basename(class_filename)}: {e}[/red]")
+        return
+    class_lectures = _class_lectures(content)
+
+    # The lecture is normally still where it was listed; search only if the file changed since
+    position = header["position"]
+    if not (position < len(class_lectures) and isinstance(class_lectures[position], dict)
+            and _lecture_key(class_lectures[position]) == header["key"]):
+        position = next((i for i, lec in enumerate(class_lectures)
+                         if isinstance(lec, dict) and _lecture_key(lec) == header["key"]), None)
+    if position is None:
+        console.print(f"[yellow]The selected lecture is no longer in {class_filename}.[/yellow]")
+        return
+    selected_lecture = class_lectures[position]
 
     # --- Speaker Labeling Logic ---
     unique_speakers = selected_lecture.get('speakers', [])
     if not unique_speakers:
         console.print("[yellow]No speaker information found in this recording.[/yellow]")
-        console.print("Press Enter to return...")
-        input()
+        _pause("return")
         return
         
     console.print("\n[bold blue]Speaker Labeling:[/bold blue]")
@@ -303,32 +687,26 @@ def handle_view_recordings(classes_data, config_data):
 
     if speaker_mapping:
         # Update the lecture data
-        for i, segment in enumerate(selected_lecture['transcript_segments']):
-            if segment['speaker'] in speaker_mapping:
-                selected_lecture['transcript_segments'][i]['speaker'] = speaker_mapping[segment['speaker']]
+        for segment in selected_lecture['transcript_segments']:
+            new_speaker = speaker_mapping.get(segment['speaker'])
+            if new_speaker is not None:
+                segment['speaker'] = new_speaker
         
-        selected_lecture['speakers'] = list(set(s['speaker'] for s in selected_lecture['transcript_segments']))
+        # The new speakers follow from the old list and the mapping; no second pass over the segments.
+        # Kept in first-appearance order, as audio_processor stores them; two labels given the same name merge
+        selected_lecture['speakers'] = list(dict.fromkeys(speaker_mapping.get(s, s) for s in unique_speakers))
+        selected_lecture.setdefault("id", uuid.uuid4().hex) # Persisted below, so later saves match on it
 
-        # Save the updated class file
+        # Save the updated class file; selected_lecture is edited in place inside `content`
         try:
-            with open(class_filename, 'r') as f:
-                class_lectures = json.load(f)
-            
-            # Find and update the specific lecture
-            for i, lec in enumerate(class_lectures):
-                # A simple check based on summary; a real app would need a unique ID
-                if lec['summary'] == selected_lecture['summary']:
-                    class_lectures[i] = selected_lecture
-                    break
-            
-            with open(class_filename, 'w') as f:
-                json.dump(class_lectures, f, indent=2)
+            _json_dump(class_filename, content)
+            # The next visit lists this file from memory instead of parsing what was just written
+            _cache_lecture_headers(class_filename, os.stat(class_filename), content)
             console.print(f"[green]Speaker labels updated successfully for the selected lecture.[/green]")
         except Exception as e:
             console.print(f"[red]Error saving updated data: {e}[/red]")
 
-    console.print("\nPress Enter to return to the main menu...")
-    input()
+    _pause("return to the main menu", newline=True)
 
 def handle_add_notes_to_class(classes_data):
     """Handles adding notes to a specific class."""
@@ -336,32 +714,20 @@ def handle_add_notes_to_class(classes_data):
     
     if not classes_data or not classes_data.get("courses"):
         console.print("[yellow]No courses available. Please add a course first.[/yellow]")
-        console.print("Press Enter to return to the main menu...")
-        input()
+        _pause("return to the main menu")
         return
 
-    table = Table(title="[bold blue]Select a Class to Add Notes To[/bold blue]")
-    table.add_column("ID", style="dim", width=5)
-    table.add_column("Course Name", width=30)
+    table = _make_table("[bold blue]Select a Class to Add Notes To[/bold blue]", _CLASS_CHOICE_COLUMNS)
 
     for i, course in enumerate(classes_data["courses"]):
         table.add_row(str(i + 1), course["name"])
     
     console.print(table)
 
-    while True:
-        choice_str = console.input("Enter the ID of the class (or 'b' to go back): ")
-        if choice_str.lower() == 'b':
-            return
-        try:
-            choice = int(choice_str)
-            if 1 <= choice <= len(classes_data["courses"]):
-                selected_course = classes_data["courses"][choice - 1]
-                break
-            else:
-                console.print("[red]Invalid choice.[/red]")
-        except ValueError:
-            console.print("[red]Invalid input.[/red]")
+    choice = _prompt_int_in_range("Enter the ID of the class (or 'b' to go back): ", 1, len(classes_data["courses"]))
+    if choice is None:
+        return
+    selected_course = classes_data["courses"][choice - 1]
 
     class_name = selected_course["name"]
     class_filename = f"data/{class_name.replace(' ', '_')}.json"
@@ -378,33 +744,28 @@ def handle_add_notes_to_class(classes_data):
     full_note = "\n".join(notes)
 
     if os.path.exists(class_filename):
-        with open(class_filename, 'r+') as f:
-            class_data = json.load(f)
-            if not isinstance(class_data, list): # Assuming it's a list of lectures
-                # If the file is not a list, we might need to decide on a structure.
-                # For now, let's assume we add notes to the top-level object if it's a dict.
-                if "notes" not in class_data:
-                    class_data["notes"] = []
-                class_data["notes"].append(full_note)
-            else:
-                # If it's a list of lectures, where do we add the note?
-                # For now, let's create a new structure if we only have a list.
-                # This part of the logic might need refinement based on desired JSON structure.
-                # Let's assume for now we want to store notes at the top level, so we convert the file structure.
-                console.print("[yellow]Note: Adding notes to a class file that is a list of lectures. Converting to a dictionary structure.[/yellow]")
-                class_data = {"lectures": class_data, "notes": [full_note]}
+        class_data = _json_load(class_filename)
+        if not isinstance(class_data, list): # Assuming it's a list of lectures
+            # If the file is not a list, we might need to decide on a structure.
+            # For now, let's assume we add notes to the top-level object if it's a dict.
+            if "notes" not in class_data:
+                class_data["notes"] = []
+            class_data["notes"].append(full_note)
+        else:
+            # If it's a list of lectures, where do we add the note?
+            # For now, let's create a new structure if we only have a list.
+            # This part of the logic might need refinement based on desired JSON structure.
+            # Let's assume for now we want to store notes at the top level, so we convert the file structure.
+            console.print("[yellow]Note: Adding notes to a class file that is a list of lectures. Converting to a dictionary structure.[/yellow]")
+            class_data = {"lectures": class_data, "notes": [full_note]}
 
-            f.seek(0)
-            json.dump(class_data, f, indent=2)
-            f.truncate()
+        _json_dump(class_filename, class_data)
 
     else:
-        with open(class_filename, 'w') as f:
-            json.dump({"lectures": [], "notes": [full_note]}, f, indent=2)
+        _json_dump(class_filename, {"lectures": [], "notes": [full_note]})
 
     console.print(f"[green]Notes added successfully to {class_name}.[/green]")
-    console.print("Press Enter to return to the main menu...")
-    input()
+    _pause("return to the main menu")
 
 def handle_manage_courses(classes_data):
     """Handles the 'Manage Courses' option."""
@@ -434,7 +795,7 @@ def handle_manage_courses(classes_data):
         
         # Refresh classes_data in case it was modified by add/edit/delete
         # This is a simple way to ensure we're working with the latest data.
-        # A more robust approach might involve passing the modified data back.
+        # Unchanged files are served from _FILE_CACHE, so this does not re-parse every turn.
         classes_data = load_classes_handler(CLASSES_PATH) # Use handler
 
     return classes_data # Return modified data
@@ -446,24 +807,12 @@ def view_all_courses(classes_data):
         console.print("[italic]No courses defined.[/italic]")
         return
 
-    table = Table(title="[bold blue]Courses[/bold blue]")
-    table.add_column("ID", style="dim", width=5)
-    table.add_column("Course Name", width=30)
-    table.add_column("Keywords", width=40)
-    table.add_column("Duration (min)", width=15)
-    table.add_column("Schedule", width=40) # Added Schedule column
+    table = _make_table("[bold blue]Courses[/bold blue]", _COURSE_COLUMNS)
 
     for i, course in enumerate(classes_data["courses"]):
-        # Format schedule for display
-        schedule_info = "No schedule set"
-        if "schedule" in course and course["schedule"]:
-            schedule_entries = []
-            for entry in course["schedule"]:
-                days = ", ".join(entry.get("days", []))
-                start_time = entry.get("start_time", "N/A")
-                schedule_entries.append(f"{days} {start_time}")
-            schedule_info = "; ".join(schedule_entries)
-        
+        # Formatted at load time; courses added since the last load are formatted here
+        schedule_info = course.get("_schedule_display") or _format_schedule(course)
+
         table.add_row(
             str(i + 1),
             course["name"],
@@ -472,8 +821,7 @@ def view_all_courses(classes_data):
             schedule_info # Add schedule info to the row
         )
     console.print(table)
-    console.print("Press Enter to return to the Manage Courses menu...")
-    input()
+    _pause("return to the Manage Courses menu")
 
 def add_course(classes_data):
     """Adds a new course to the classes data."""
@@ -483,15 +831,13 @@ def add_course(classes_data):
     keywords = [k.strip() for k in keywords_str.split(',') if k.strip()]
     
     while True:
-        duration_str = console.input("Enter duration in minutes (e.g., 60): ")
-        try:
-            duration = int(duration_str)
-            if duration > 0:
-                break
-            else:
-                console.print("[red]Duration must be a positive number.[/red]")
-        except ValueError:
+        duration_str = console.input("Enter duration in minutes (e.g., 60): ").strip()
+        if not duration_str.isdecimal():
             console.print("[red]Invalid input. Please enter a number for duration.[/red]")
+        elif (duration := int(duration_str)) > 0:
+            break
+        else:
+            console.print("[red]Duration must be a positive number.[/red]")
 
     new_course = {
         "name": course_name,
@@ -499,45 +845,23 @@ def add_course(classes_data):
         "duration_minutes": duration
     }
     classes_data["courses"].append(new_course)
-    save_classes_handler(classes_data, CLASSES_PATH) # Use handler
-    console.print(f"[green]Course '{course_name}' added successfully.[/green]")
+    if _append_course_journal(new_course, CLASSES_PATH, classes_data.get("journal_generation")): # Appends one line; folded into classes.json on the next full save
+        console.print(f"[green]Course '{course_name}' added successfully.[/green]")
     return classes_data # Return modified data
 
 def edit_course(classes_data):
     """Edits an existing course."""
-    console.print("\n[bold blue]Edit Course[/bold blue]")
+    header = "\n[bold blue]Edit Course[/bold blue]"
     if not classes_data or not classes_data.get("courses"):
-        console.print("[yellow]No courses available to edit.[/yellow]")
+        console.print(Group(header, "[yellow]No courses available to edit.[/yellow]"))
         return None # Indicate no change
 
-    table = Table(title="[bold blue]Select Course to Edit[/bold blue]")
-    table.add_column("ID", style="dim", width=5)
-    table.add_column("Course Name", width=30)
-    table.add_column("Keywords", width=40)
-    table.add_column("Duration (min)", width=15)
-
-    for i, course in enumerate(classes_data["courses"]):
-        table.add_row(
-            str(i + 1),
-            course["name"],
-            ", ".join(course.get("keywords", [])),
-            str(course["duration_minutes"])
-        )
-    console.print(table)
+    console.print(Group(header, _course_choice_table("[bold blue]Select Course to Edit[/bold blue]", classes_data["courses"])))
 
-    while True:
-        course_id_str = console.input("Enter the ID of the course to edit (or 'b' to go back): ")
-        if course_id_str.lower() == 'b':
-            return classes_data # Return original data if backing out
-        try:
-            course_id = int(course_id_str)
-            if 1 <= course_id <= len(classes_data["courses"]):
-                course_index = course_id - 1
-                break
-            else:
-                console.print("[red]Invalid course ID.[/red]")
-        except ValueError:
-            console.print("[red]Invalid input. Please enter a number or 'b'.[/red]")
+    course_id = _prompt_int_in_range("Enter the ID of the course to edit (or 'b' to go back): ", 1, len(classes_data["courses"]))
+    if course_id is None:
+        return classes_data # Return original data if backing out
+    course_index = course_id - 1
 
     course = classes_data["courses"][course_index]
     console.print(f"\nEditing course: [bold]{course['name']}[/bold]")
@@ -549,18 +873,16 @@ def edit_course(classes_data):
     new_keywords = [k.strip() for k in keywords_str.split(',') if k.strip()] if keywords_str else course.get('keywords', [])
 
     while True:
-        duration_str = console.input(f"Enter new duration in minutes (current: {course['duration_minutes']}): ")
+        duration_str = console.input(f"Enter new duration in minutes (current: {course['duration_minutes']}): ").strip()
         if not duration_str:
             new_duration = course['duration_minutes']
             break
-        try:
-            new_duration = int(duration_str)
-            if new_duration > 0:
-                break
-            else:
-                console.print("[red]Duration must be a positive number.[/red]")
-        except ValueError:
+        if not duration_str.isdecimal():
             console.print("[red]Invalid input. Please enter a number for duration.[/red]")
+        elif (new_duration := int(duration_str)) > 0:
+            break
+        else:
+            console.print("[red]Duration must be a positive number.[/red]")
 
     # --- Edit Schedule ---
     current_schedule = course.get("schedule", [])
@@ -602,40 +924,28 @@ def edit_course(classes_data):
                 console.print("[yellow]No schedule entries to edit. Please add an entry first.[/yellow]")
                 continue
             
-            entry_id_str = console.input("Enter the number of the entry to edit: ")
-            try:
-                entry_id = int(entry_id_str)
-                if 1 <= entry_id <= len(current_schedule):
-                    entry_index = entry_id - 1
-                    days_str = console.input(f"Enter new days (current: {', '.join(current_schedule[entry_index].get('days', []))}): ")
-                    start_time = console.input(f"Enter new start time (current: {current_schedule[entry_index].get('start_time', 'N/A')}): ")
-                    
-                    if days_str:
-                        current_schedule[entry_index]["days"] = [d.strip() for d in days_str.split(',') if d.strip()]
-                    if start_time:
-                        current_schedule[entry_index]["start_time"] = start_time
-                    
-                    console.print("[green]Schedule entry updated.[/green]")
-                else:
-                    console.print("[red]Invalid entry number.[/red]")
-            except ValueError:
-                console.print("[red]Invalid input. Please enter a number.[/red]")
+            entry_id = _prompt_int_in_range("Enter the number of the entry to edit (or 'b' to go back): ", 1, len(current_schedule))
+            if entry_id is not None:
+                entry_index = entry_id - 1
+                days_str = console.input(f"Enter new days (current: {', '.join(current_schedule[entry_index].get('days', []))}): ")
+                start_time = console.input(f"Enter new start time (current: {current_schedule[entry_index].get('start_time', 'N/A')}): ")
+                
+                if days_str:
+                    current_schedule[entry_index]["days"] = [d.strip() for d in days_str.split(',') if d.strip()]
+                if start_time:
+                    current_schedule[entry_index]["start_time"] = start_time
+                
+                console.print("[green]Schedule entry updated.[/green]")
         elif schedule_choice == '3':
             # Delete schedule entry
             if not current_schedule:
                 console.print("[yellow]No schedule entries to delete. Please add an entry first.[/yellow]")
                 continue
             
-            entry_id_str = console.input("Enter the number of the entry to delete: ")
-            try:
-                entry_id = int(entry_id_str)
-                if 1 <= entry_id <= len(current_schedule):
-                    del current_schedule[entry_id - 1]
-                    console.print("[green]Schedule entry deleted.[/green]")
-                else:
-                    console.print("[red]Invalid entry number.[/red]")
-            except ValueError:
-                console.print("[red]Invalid input. Please enter a number.[/red]")
+            entry_id = _prompt_int_in_range("Enter the number of the entry to delete (or 'b' to go back): ", 1, len(current_schedule))
+            if entry_id is not None:
+                del current_schedule[entry_id - 1]
+                console.print("[green]Schedule entry deleted.[/green]")
         elif schedule_choice == '4':
             # Done editing schedule
             break
@@ -654,16 +964,93 @@ def edit_course(classes_data):
     console.print(f"[green]Course '{new_name}' updated successfully.[/green]")
     return classes_data # Return modified data
 
-def _get_gemini_models():
-    """Fetches available Gemini models from the API."""
+def _get_gemini_models(api_key=None):
+    """
+    Fetches available Gemini models from the API, reusing the last list for GEMINI_MODELS_TTL_SECONDS.
+    On the first call of a session a list saved on disk by an earlier session (same API key, younger
+    than GEMINI_MODELS_DISK_TTL_SECONDS) is returned right away and refreshed in the background.
+    Returns {"all": every model name, "show": the models the picker offers}; treat it as read-only.
+    """
+    global _GEMINI_MODELS_CACHE
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+    with _GEMINI_MODELS_LOCK:
+        if (_GEMINI_MODELS_CACHE and _GEMINI_MODELS_CACHE[1] == key_hash
+                and time.monotonic() - _GEMINI_MODELS_CACHE[0] < GEMINI_MODELS_TTL_SECONDS):
+            return _GEMINI_MODELS_CACHE[2]
+
+        if _GEMINI_MODELS_CACHE is None:
+            model_names = _read_gemini_models_file(key_hash)
+            if model_names is not None:
+                _GEMINI_MODELS_CACHE = (time.monotonic(), key_hash, _gemini_models_payload(model_names))
+                threading.Thread(target=_refresh_gemini_models, args=(api_key, key_hash), daemon=True).start()
+                return _GEMINI_MODELS_CACHE[2]
+
+        model_names = _fetch_gemini_models(api_key)
+        if model_names is None:
+            return {"all": [], "show": []} # Not cached, so the next visit tries again
+        return _store_gemini_models(key_hash, model_names)
+
+def _gemini_models_payload(model_names):
+    """Pairs the model names with the ones the picker shows: the 2.5 models, else the four newest names."""
+    models_to_show = [m for m in model_names if '2.5' in m] or sorted(model_names, reverse=True)[:4]
+    return {"all": model_names, "show": models_to_show}
+
+def _fetch_gemini_models(api_key, quiet=False):
+    """Asks the API for the Gemini models that can generate content. Returns None on failure."""
     try:
-        # The API key is configured in the main script before this would be called
+        # Imported on first use: google.generativeai is slow to import and most sessions never open the picker
+        import google.generativeai as genai
+        if api_key:
+            genai.configure(api_key=api_key) # The models may not have been loaded yet to configure it
         models = genai.list_models()
         # Filter for generative models that are relevant for summarization
         return [m.name for m in models if 'generateContent' in m.supported_generation_methods and "gemini" in m.name]
     except Exception as e:
-        console.print(f"[bold red]Error fetching Gemini models:[/bold red] {e}")
-        return []
+        if not quiet:
+            console.print(f"[bold red]Error fetching Gemini models:[/bold red] {e}")
+        return None
+
+def _refresh_gemini_models(api_key, key_hash):
+    """Replaces a model list read from disk with a fresh one. Runs on a background thread."""
+    model_names = _fetch_gemini_models(api_key, quiet=True) # Must not print over the model picker
+    if model_names is not None:
+        with _GEMINI_MODELS_LOCK:
+            _store_gemini_models(key_hash, model_names)
+
+def _store_gemini_models(key_hash, model_names):
+    """Caches a fetched model list in memory and on disk and returns its payload. Call with _GEMINI_MODELS_LOCK held."""
+    global _GEMINI_MODELS_CACHE
+    _GEMINI_MODELS_CACHE = (time.monotonic(), key_hash, _gemini_models_payload(model_names))
+    try:
+        os.makedirs(os.path.dirname(GEMINI_MODELS_CACHE_PATH), exist_ok=True)
+        _json_dump(GEMINI_MODELS_CACHE_PATH, {"api_key_sha256": key_hash, "timestamp": time.time(), "models": model_names})
+    except OSError:
+        pass # The in-memory copy is enough for this session
+    return _GEMINI_MODELS_CACHE[2]
+
+def _read_gemini_models_file(key_hash):
+    """Returns the model list saved on disk if it belongs to this API key and is recent enough, else None."""
+    try:
+        cached = _json_load(GEMINI_MODELS_CACHE_PATH)
+    except (OSError, ValueError):
+        return None
+    # The file is user-writable, so anything of the wrong shape is a cache miss
+    if not isinstance(cached, dict) or cached.get("api_key_sha256") != key_hash:
+        return None
+    timestamp, models = cached.get("timestamp"), cached.get("models")
+    if not isinstance(timestamp, (int, float)) or time.time() - timestamp >= GEMINI_MODELS_DISK_TTL_SECONDS:
+        return None
+    if not isinstance(models, list) or not all(isinstance(m, str) for m in models):
+        return None
+    return models
+
+def _clear_gemini_models_cache():
+    """Forgets the cached model lists so the next _get_gemini_models() call asks the API again."""
+    global _GEMINI_MODELS_CACHE
+    with _GEMINI_MODELS_LOCK:
+        _GEMINI_MODELS_CACHE = None
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(GEMINI_MODELS_CACHE_PATH)
 
 def handle_select_gemini_model(config_data):
     """Handles the selection of the Gemini model."""
@@ -672,153 +1059,150 @@ def handle_select_gemini_model(config_data):
     current_model = config_data.get("app_settings", {}).get("gemini_model", "gemini-2.5-flash-latest")
     console.print(f"Current model: [bold cyan]{current_model}[/bold cyan]")
 
-    available_models = _get_gemini_models()
+    available_models = _get_gemini_models(config_data.get("app_settings", {}).get("gemini_api_key"))
     
-    if not available_models:
+    if not available_models["all"]:
         console.print("[yellow]Could not retrieve available models. Please check your API key and internet connection.[/yellow]")
-        console.print("Press Enter to return to settings...")
-        input()
+        _pause("return to settings")
         return config_data
 
-    # Present only the 2.5 models
-    models_to_show = [m for m in available_models if '2.5' in m]
-    if not models_to_show:
-        # Fallback to showing all models if no 2.5 models are available
-        models_to_show = sorted(available_models, reverse=True)[:4]
+    # Only the 2.5 models, or the newest few when there are none; filtered once per fetch
+    models_to_show = available_models["show"]
 
     console.print("\nSelect a new model:")
     for i, model_name in enumerate(models_to_show):
         console.print(f"{i + 1}. {model_name}")
     
+    console.print("r. Refresh model list")
     console.print("0. Back to Settings")
 
     while True:
-        choice_str = console.input("\nEnter your choice: ")
-        try:
-            choice = int(choice_str)
-            if 0 <= choice <= len(models_to_show):
-                if choice == 0:
-                    return config_data # No change
-                
-                selected_model = models_to_show[choice - 1]
-                config_data["app_settings"]["gemini_model"] = selected_model
-                save_config_handler(config_data, CONFIG_PATH)
-                console.print(f"[green]Gemini model updated to: [bold]{selected_model}[/bold][/green]")
-                console.print("Press Enter to return to settings...")
-                input()
-                return config_data
-            else:
-                console.print("[red]Invalid choice. Please select a valid number.[/red]")
-        except ValueError:
+        choice_str = console.input("\nEnter your choice: ").strip()
+        if choice_str.lower() == 'r':
+            _clear_gemini_models_cache()
+            return handle_select_gemini_model(config_data)
+        if not choice_str.isdecimal():
             console.print("[red]Invalid input. Please enter a number.[/red]")
+            continue
+
+        choice = int(choice_str)
+        if 0 <= choice <= len(models_to_show):
+            if choice == 0:
+                return config_data # No change
+            
+            selected_model = models_to_show[choice - 1]
+            config_data["app_settings"]["gemini_model"] = selected_model # Saved by handle_settings
+            console.print(f"[green]Gemini model updated to: [bold]{selected_model}[/bold][/green]")
+            _pause("return to settings")
+            return config_data
+        else:
+            console.print("[red]Invalid choice. Please select a valid number.[/red]")
 
 def delete_course(classes_data):
     """Deletes a course from the classes data."""
-    console.print("\n[bold blue]Delete Course[/bold blue]")
+    header = "\n[bold blue]Delete Course[/bold blue]"
     if not classes_data or not classes_data.get("courses"):
-        console.print("[yellow]No courses available to delete.[/yellow]")
+        console.print(Group(header, "[yellow]No courses available to delete.[/yellow]"))
         return classes_data # Return original data
 
-    table = Table(title="[bold blue]Select Course to Delete[/bold blue]")
-    table.add_column("ID", style="dim", width=5)
-    table.add_column("Course Name", width=30)
-    table.add_column("Keywords", width=40)
-    table.add_column("Duration (min)", width=15)
-
-    for i, course in enumerate(classes_data["courses"]):
-        table.add_row(
-            str(i + 1),
-            course["name"],
-            ", ".join(course.get("keywords", [])),
-            str(course["duration_minutes"])
-        )
-    console.print(table)
+    # Header and table go out in one print so the screen is rendered and written once
+    console.print(Group(header, _course_choice_table("[bold blue]Select Course to Delete[/bold blue]", classes_data["courses"])))
 
-    while True:
-        course_id_str = console.input("Enter the ID of the course to delete (or 'b' to go back): ")
-        if course_id_str.lower() == 'b':
-            return classes_data # Return original data if backing out
-        try:
-            course_id = int(course_id_str)
-            if 1 <= course_id <= len(classes_data["courses"]):
-                course_index = course_id - 1
-                break
-            else:
-                console.print("[red]Invalid course ID.[/red]")
-        except ValueError:
-            console.print("[red]Invalid input. Please enter a number or 'b'.[/red]")
+    course_id = _prompt_int_in_range("Enter the ID of the course to delete (or 'b' to go back): ", 1, len(classes_data["courses"]))
+    if course_id is None:
+        return classes_data # Return original data if backing out
+    course_index = course_id - 1
 
     deleted_course_name = classes_data["courses"][course_index]["name"] # Corrected index variable
+    # Not swap-and-pop: course order is the ID order users pick from, and the first listed
+    # course wins overlapping schedule slots in _index_schedules
     del classes_data["courses"][course_index]
     save_classes_handler(classes_data, CLASSES_PATH) # Use handler
     console.print(f"[green]Course '{deleted_course_name}' deleted successfully.[/green]")
     return classes_data # Return modified data
 
+_API_KEY_NOTE = (
+    "\n[bold yellow]Note:[/bold yellow] It is recommended to store API keys in a .env file for security.\n"
+    "This application currently stores the key in config.yaml for simplicity."
+)
+
+# Each settings action takes config_data and returns True if it changed anything
+def _view_settings(config_data):
+    """Settings option 1: lists the current app settings."""
+    console.print("\nCurrent Settings:")
+    if config_data and "app_settings" in config_data:
+        for key, value in config_data["app_settings"].items():
+            console.print(f"- {key}: {value}")
+    else:
+        console.print("[italic]No settings loaded or available.[/italic]")
+    _pause("continue", newline=True)
+    return False
+
+def _edit_directory_setting(config_data, key, label):
+    """Prompts for a new directory for app_settings[key]."""
+    new_dir = console.input(f"Enter new {label} directory (current: {config_data['app_settings'][key]}): ")
+    if not new_dir:
+        console.print("[yellow]No change made.[/yellow]")
+        return False
+    config_data['app_settings'][key] = new_dir
+    console.print(f"[green]{label.capitalize()} directory updated to '{new_dir}'.[/green]")
+    return True
+
+def _edit_api_key_setting(config_data, key, label):
+    """Prompts for a new API key for app_settings[key], showing only a mask of the current one."""
+    console.print(_API_KEY_NOTE)
+    api_key = console.input(f"Enter new {label} API Key (current: {_mask_key(config_data['app_settings'][key])}): ")
+    if not api_key:
+        console.print("[yellow]No change made.[/yellow]")
+        return False
+    config_data['app_settings'][key] = api_key
+    console.print(f"[green]{label} API Key updated.[/green]")
+    return True
+
+def _edit_incoming_dir(config_data):
+    return _edit_directory_setting(config_data, 'incoming_audio_dir', "incoming audio")
+
+def _edit_processed_dir(config_data):
+    return _edit_directory_setting(config_data, 'processed_recordings_dir', "processed recordings")
+
+def _edit_gemini_key(config_data):
+    return _edit_api_key_setting(config_data, 'gemini_api_key', "Gemini")
+
+def _edit_gemini_model(config_data):
+    previous_model = config_data["app_settings"].get("gemini_model")
+    handle_select_gemini_model(config_data)
+    return config_data["app_settings"].get("gemini_model") != previous_model
+
+def _edit_hf_key(config_data):
+    return _edit_api_key_setting(config_data, 'huggingface_api_key', "Hugging Face")
+
+_SETTINGS_DISPATCH = {
+    '1': _view_settings,
+    '2': _edit_incoming_dir,
+    '3': _edit_processed_dir,
+    '4': _edit_gemini_key,
+    '5': _edit_gemini_model,
+    '6': _edit_hf_key,
+}
+
 def handle_settings(config_data):
     """Handles the 'Settings' option."""
-    while True:
-        console.print("\n[bold blue]Settings[/bold blue]")
-        console.print("""
-1. View Current Settings
-2. Edit Incoming Audio Directory
-3. Edit Processed Recordings Directory
-4. Update Gemini API Key
-5. Select Gemini Model
-6. Update Hugging Face API Key
-0. Back to Main Menu
-        """)
-        choice = console.input("[bold cyan]Enter your choice (1-6, 0): [/bold cyan]")
-
-        if choice == '1':
-            console.print("\nCurrent Settings:")
-            if config_data and "app_settings" in config_data:
-                for key, value in config_data["app_settings"].items():
-                    console.print(f"- {key}: {value}")
-            else:
-                console.print("[italic]No settings loaded or available.[/italic]")
-            console.print("\nPress Enter to continue...")
-            input()
-        elif choice == '2':
-            new_dir = console.input(f"Enter new incoming audio directory (current: {config_data['app_settings']['incoming_audio_dir']}): ")
-            if new_dir:
-                config_data['app_settings']['incoming_audio_dir'] = new_dir
-                save_config_handler(config_data, CONFIG_PATH)
-                console.print(f"[green]Incoming audio directory updated to '{new_dir}'.[/green]")
-            else:
-                console.print("[yellow]No change made.[/yellow]")
-        elif choice == '3':
-            new_dir = console.input(f"Enter new processed recordings directory (current: {config_data['app_settings']['processed_recordings_dir']}): ")
-            if new_dir:
-                config_data['app_settings']['processed_recordings_dir'] = new_dir
-                save_config_handler(config_data, CONFIG_PATH)
-                console.print(f"[green]Processed recordings directory updated to '{new_dir}'.[/green]")
-            else:
-                console.print("[yellow]No change made.[/yellow]")
-        elif choice == '4':
-            console.print("\n[bold yellow]Note:[/bold yellow] It is recommended to store API keys in a .env file for security.")
-            console.print("This application currently stores the key in config.yaml for simplicity.")
-            api_key = console.input(f"Enter new Gemini API Key (current: {'*' * len(config_data['app_settings']['gemini_api_key']) if config_data['app_settings']['gemini_api_key'] else 'Not Set'}): ")
-            if api_key:
-                config_data['app_settings']['gemini_api_key'] = api_key
-                save_config_handler(config_data, CONFIG_PATH)
-                console.print("[green]Gemini API Key updated.[/green]")
-            else:
-                console.print("[yellow]No change made.[/yellow]")
-        elif choice == '5':
-            config_data = handle_select_gemini_model(config_data)
-        elif choice == '6':
-            console.print("\n[bold yellow]Note:[/bold yellow] It is recommended to store API keys in a .env file for security.")
-            console.print("This application currently stores the key in config.yaml for simplicity.")
-            api_key = console.input(f"Enter new Hugging Face API Key (current: {'*' * len(config_data['app_settings']['huggingface_api_key']) if config_data['app_settings']['huggingface_api_key'] else 'Not Set'}): ")
-            if api_key:
-                config_data['app_settings']['huggingface_api_key'] = api_key
-                save_config_handler(config_data, CONFIG_PATH)
-                console.print("[green]Hugging Face API Key updated.[/green]")
+    # Edits are written once when leaving the menu, not after every change
+    config_dirty = False
+    try:
+        while True:
+            console.print(Group("\n[bold blue]Settings[/bold blue]", _SETTINGS_MENU_TEXT))
+            choice = console.input("[bold cyan]Enter your choice (1-6, 0): [/bold cyan]")
+
+            action = _SETTINGS_DISPATCH.get(choice)
+            if action:
+                config_dirty |= action(config_data)
+            elif choice == '0':
+                break
             else:
-                console.print("[yellow]No change made.[/yellow]")
-        elif choice == '0':
-            break
-        else:
-            console.print("[red]Invalid choice. Please enter a number between 1-6 or 0.[/red]")
+                console.print("[red]Invalid choice. Please enter a number between 1-6 or 0.[/red]")
+    finally:
+        if config_dirty:
+            save_config_handler(config_data, CONFIG_PATH)
     
     return config_data # Return modified data
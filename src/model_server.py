@@ -0,0 +1,141 @@
+# src/model_server.py
+# Keeps the AI models loaded in a long-lived process so TUI restarts skip the model load.
+# Start it with `python main.py --serve`; the TUI connects to it automatically when it is running.
+
+import asyncio
+import getpass
+import os
+import secrets
+import stat
+import tempfile
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from rich.console import Console
+
+console = Console()
+
+# Socket and auth key live in a per-user directory that only that user can read.
+# The fallback path under /tmp is predictable, so its ownership and mode are checked before every use.
+SERVER_DIR = (
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "classcodex") if os.environ.get("XDG_RUNTIME_DIR")
+    else os.path.join(tempfile.gettempdir(), f"classcodex-{getpass.getuser()}")
+)
+SOCKET_PATH = os.path.join(SERVER_DIR, "models.sock")
+AUTHKEY_PATH = os.path.join(SERVER_DIR, "authkey")
+
+# Clients are served on their own threads, but the models run one request at a time
+_PROCESS_LOCK = threading.Lock()
+
+def serve(audio_processor, config_data):
+    """Loads the AI models once and processes recordings for TUI clients until interrupted."""
+    loaded_models = audio_processor.load_models(config_data)
+    if not loaded_models:
+        console.print("[bold red]Failed to load AI models. Model server not started.[/bold red]")
+        return
+
+    os.makedirs(SERVER_DIR, mode=0o700, exist_ok=True)
+    if not _server_dir_is_private():
+        console.print(f"[bold red]{SERVER_DIR} is not a directory private to this user. Model server not started.[/bold red]")
+        return
+    authkey = secrets.token_bytes(32)
+    fd = os.open(AUTHKEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(authkey)
+    if os.path.exists(SOCKET_PATH):
+        os.remove(SOCKET_PATH) # Left behind by a server that did not shut down cleanly
+
+    console.print(f"[bold green]Model server listening on {SOCKET_PATH}. Press Ctrl+C to stop.[/bold green]")
+    try:
+        with Listener(SOCKET_PATH, family="AF_UNIX", authkey=authkey) as listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError) as e:
+                    console.print(f"[yellow]Dropped client connection:[/yellow] {e}")
+                    continue
+                # A TUI keeps its connection open for its whole session, so the next TUI must not wait on it
+                threading.Thread(target=_serve_client, args=(conn, audio_processor, loaded_models), daemon=True).start()
+    except KeyboardInterrupt:
+        console.print("\n[bold magenta]Model server stopped.[/bold magenta]")
+    finally:
+        if os.path.exists(AUTHKEY_PATH):
+            os.remove(AUTHKEY_PATH)
+
+def _server_dir_is_private():
+    """
+    True if SERVER_DIR is a real directory (not a symlink) owned by this user that no one else can access.
+    Otherwise another local user could plant their own auth key and socket in it.
+    """
+    try:
+        st = os.lstat(SERVER_DIR)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and st.st_mode & 0o077 == 0
+
+def _serve_client(conn, audio_processor, loaded_models):
+    """Runs on a thread per TUI client; owns and closes `conn`."""
+    with conn:
+        console.print("[cyan]TUI client connected.[/cyan]")
+        try:
+            _handle_client(conn, audio_processor, loaded_models)
+        except OSError as e:
+            console.print(f"[yellow]Dropped client connection:[/yellow] {e}")
+        console.print("[cyan]TUI client disconnected.[/cyan]")
+
+def _handle_client(conn, audio_processor, loaded_models):
+    """Answers requests from one TUI session until it disconnects."""
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+
+        if request[0] == "process":
+            _, filepaths, config_data, classes_data = request
+
+            async def stream_results():
+                async for result in audio_processor.process_audio_files(filepaths, config_data, classes_data, loaded_models):
+                    conn.send(result)
+
+            try:
+                with _PROCESS_LOCK:
+                    asyncio.run(stream_results())
+            except Exception as e:
+                # e.g. CUDA out of memory; the server and its models stay up for the next request
+                console.print(f"[bold red]Error processing request:[/bold red] {e}")
+            finally:
+                conn.send(None) # End of results for this request
+        else:
+            console.print(f"[yellow]Ignoring unknown request:[/yellow] {request[0]}")
+
+class ModelClient:
+    """
+    Stands in for the audio_processor module in the TUI, running the processing
+    pipeline in the model server instead of the TUI process.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def process_audio_files(self, filepaths, config_data, classes_data, loaded_models=None):
+        """Same contract as audio_processor.process_audio_files; results stream back as each file finishes."""
+        try:
+            self._conn.send(("process", filepaths, config_data, classes_data))
+            while (result := await asyncio.to_thread(self._conn.recv)) is not None:
+                yield result
+        except (OSError, EOFError) as e:
+            # Recordings that were not returned stay in the incoming directory for the next run
+            console.print(f"[bold red]Lost connection to the model server:[/bold red] {e}. Restart it, or the TUI, to process the remaining recordings.")
+
+def connect():
+    """Returns a ModelClient for a running model server, or None if none is running."""
+    if not _server_dir_is_private():
+        return None # Missing, or possibly someone else's; never send the config (with its API keys) there
+    try:
+        with open(AUTHKEY_PATH, 'rb') as f:
+            authkey = f.read()
+        return ModelClient(Client(SOCKET_PATH, family="AF_UNIX", authkey=authkey))
+    except (OSError, EOFError, ValueError, AuthenticationError):
+        return None
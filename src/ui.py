@@ -1,15 +1,19 @@
 # src/ui.py
 # Contains functions for displaying TUI elements using the 'rich' library.
 
+import functools
+
 from rich.console import Console
-from rich.layout import Layout
-from rich.panel import Panel
-from rich.table import Table
 
 console = Console()
 
-def display_main_menu():
-    """Displays the main menu using rich."""
+@functools.cache
+def _main_menu_layout():
+    """Builds the main menu layout. It never changes, so this runs once, on the first redraw."""
+    # Imported here so starting the app does not pay for Rich's layout modules before the menu is shown
+    from rich.layout import Layout
+    from rich.panel import Panel
+
     layout = Layout()
     layout.split_column(
         Layout(name="header", size=3),
@@ -28,12 +32,14 @@ def display_main_menu():
 6. Exit
     """, title="[bold blue]Navigation[/bold blue]", border_style="blue"))
     layout["footer"].update(Panel("Enter your choice: ", style="dim"))
+    return layout
 
-
+def display_main_menu():
+    """Displays the main menu using rich."""
     # Use console.print directly as live.update is for dynamic updates within a loop
     # If this is meant to be part of a live display, it needs to be managed differently.
     # For now, assuming it's a static display before input.
-    console.print(layout)
+    console.print(_main_menu_layout())
 
 # Placeholder for other UI functions that might be moved later
 # e.g., display_progress_bar, display_table, etc.